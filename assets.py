@@ -0,0 +1,141 @@
+"""
+Gem Slap - Asset Pipeline
+Minifies the front-end scripts into content-hashed files with gzip and brotli
+variants beside them, renders the index page once against those hashed URLs,
+and rewrites the service worker's SHELL_ASSETS to the same list.
+
+Built with `flask --app main build-assets`. Without rjsmin/rcssmin/brotli
+installed the build still works: files are copied unminified and only the
+gzip variant is written.
+"""
+import gzip, hashlib, json, mimetypes, os, re
+
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+try:
+    import rcssmin
+except ImportError:
+    rcssmin = None
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+ASSET_DIR = os.path.join(STATIC_DIR, 'dist')
+ASSET_URL_PREFIX = '/assets/'
+MANIFEST_NAME = 'manifest.json'
+
+# Load order matters: game.js reads engine.js globals, menu.js reads both
+SCRIPTS = ('engine.js', 'game.js', 'menu.js')
+SOURCE_URLS = {name: f'/static/{name}' for name in SCRIPTS}
+SERVICE_WORKER = 'service-worker.js'
+INDEX = 'index.html'
+
+# Preference order when a client accepts several
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+_STYLE_BLOCK = re.compile(r'(<style>)(.*?)(</style>)', re.S)
+_SHELL_ASSETS = re.compile(r'const SHELL_ASSETS = \[.*?\];', re.S)
+_ASSET_BUILD = re.compile(r"const ASSET_BUILD = '[^']*';")
+
+
+def minify_js(source):
+    return rjsmin.jsmin(source) if rjsmin else source
+
+
+def minify_css(source):
+    return rcssmin.cssmin(source) if rcssmin else source
+
+
+def minify_html(html):
+    # Only the inline <style> is minified; markup whitespace is left to the
+    # compressors, which shrink it to almost nothing anyway
+    return _STYLE_BLOCK.sub(lambda m: m[1] + minify_css(m[2]) + m[3], html)
+
+
+def sync_service_worker(source, shell_urls, build):
+    """Point the service worker at this build's shell, or fail the build."""
+    if not _SHELL_ASSETS.search(source) or not _ASSET_BUILD.search(source):
+        raise ValueError(f'{SERVICE_WORKER} is missing SHELL_ASSETS or ASSET_BUILD')
+    source = _SHELL_ASSETS.sub(lambda _: f'const SHELL_ASSETS = {json.dumps(shell_urls)};', source)
+    return _ASSET_BUILD.sub(lambda _: f"const ASSET_BUILD = '{build}';", source)
+
+
+def _digest(body):
+    return hashlib.sha256(body).hexdigest()[:12]
+
+
+def _write_variants(out_dir, filename, body):
+    path = os.path.join(out_dir, filename)
+    with open(path, 'wb') as f:
+        f.write(body)
+    # mtime=0 keeps the compressed bytes stable for identical content
+    variants = {'gzip': gzip.compress(body, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['br'] = brotli.compress(body, quality=11)
+    for encoding, suffix in ENCODINGS:
+        if encoding in variants:
+            with open(path + suffix, 'wb') as f:
+                f.write(variants[encoding])
+    return {
+        'file': filename, 'etag': _digest(body), 'size': len(body),
+        'encodings': {encoding: len(data) for encoding, data in variants.items()},
+    }
+
+
+def build_assets(render_index, out_dir=ASSET_DIR, static_dir=STATIC_DIR):
+    """Write the hashed scripts, index page and service worker into `out_dir`.
+
+    `render_index(asset_urls)` returns the index page HTML for a mapping of
+    script name → URL.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    for name in os.listdir(out_dir):
+        os.remove(os.path.join(out_dir, name))
+
+    scripts, urls = {}, {}
+    for name in SCRIPTS:
+        with open(os.path.join(static_dir, name)) as f:
+            body = minify_js(f.read()).encode()
+        stem, ext = os.path.splitext(name)
+        hashed = f'{stem}.{_digest(body)}{ext}'
+        scripts[hashed] = _write_variants(out_dir, hashed, body)
+        urls[name] = ASSET_URL_PREFIX + hashed
+
+    index = _write_variants(out_dir, INDEX, minify_html(render_index(urls)).encode())
+    build = _digest(json.dumps([index['etag'], *sorted(scripts)]).encode())
+
+    with open(os.path.join(static_dir, SERVICE_WORKER)) as f:
+        worker = sync_service_worker(f.read(), ['/', *urls.values()], build)
+    worker = _write_variants(out_dir, SERVICE_WORKER, minify_js(worker).encode())
+
+    manifest = {
+        'build': build, 'urls': urls, 'scripts': scripts,
+        'index': index, 'serviceWorker': worker,
+    }
+    with open(os.path.join(out_dir, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def load_manifest(asset_dir=ASSET_DIR):
+    try:
+        with open(os.path.join(asset_dir, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def pick_encoding(entry, accept_encodings):
+    # (encoding, file suffix) for the best precompressed variant, or (None, '')
+    for encoding, suffix in ENCODINGS:
+        if encoding in entry['encodings'] and accept_encodings[encoding]:
+            return encoding, suffix
+    return None, ''
+
+
+def asset_mimetype(filename):
+    return mimetypes.guess_type(filename)[0] or 'application/octet-stream'
@@ -0,0 +1,293 @@
+"""
+Gem Slap - Benchmarks
+Level generation, serialization and the Flask request path.
+
+    python bench.py                     # run, compare against bench_baseline.json
+    python bench.py --save-baseline     # run and overwrite the baseline
+    python bench.py --threshold 0.1     # fail on >10% regressions
+
+Results are written as JSON (--output). Exits 1 if any gated metric regressed
+past the threshold relative to the stored baseline.
+
+Only metrics that hold still from run to run are gated: encoded sizes, which
+are deterministic, and the scalar and vector generation paths timed relative
+to a fixed calibration loop in the same run, which cancels out how fast the
+machine happens to be. Raw timings are medians over --repeat runs and are
+reported but never gated, since shared hosts swing them by more than any
+useful threshold.
+"""
+import argparse, contextlib, json, math, os, random, statistics, sys, threading, time
+from concurrent.futures import ThreadPoolExecutor
+
+from game_data import ORDERED_PATTERNS, STYLE_ORDER, STANDARD_TOTAL_ORBS
+import endless
+import level_format
+import level_pack
+import main
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_baseline.json')
+
+
+def _metric(value, unit, better, gated=False):
+    # Ungated metrics are reported but never fail the run
+    return {'value': round(value, 3), 'unit': unit, 'better': better, 'gated': gated}
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[idx]
+
+
+def _median_of(repeat, fn):
+    return statistics.median(fn() for _ in range(repeat))
+
+
+@contextlib.contextmanager
+def _without_level_store():
+    # A built instance/levels.store would otherwise answer the level routes,
+    # skipping generate_level and making results depend on whether it exists
+    store = main.level_store
+    main.level_store = None
+    try:
+        yield store
+    finally:
+        main.level_store = store
+
+
+# ── Generation ─────────────────────────────────────────────────────────────────
+def bench_generate(repeat):
+    space = list(level_pack.iter_level_space())
+
+    def run():
+        start = time.perf_counter()
+        for level_num, bass_style in space:
+            main.generate_level(level_num, bass_style)
+        return time.perf_counter() - start
+
+    elapsed = _median_of(repeat, run)
+    return {
+        'generate_level.levels_per_sec': _metric(len(space) / elapsed, 'levels/s', 'higher'),
+        'generate_level.orbs_per_sec': _metric(len(space) * STANDARD_TOTAL_ORBS / elapsed, 'orbs/s', 'higher'),
+    }
+
+
+def bench_endless(repeat, levels=1000, total_orbs=200):
+    # Vectorized engine over a whole batch, comparable to the scalar orbs/s above
+    level_nums = range(1, levels + 1)
+
+    def run():
+        start = time.perf_counter()
+        endless.generate_endless_batch(level_nums, total_orbs)
+        return time.perf_counter() - start
+
+    elapsed = _median_of(repeat, run)
+    return {'endless.batch.orbs_per_sec': _metric(levels * total_orbs / elapsed, 'orbs/s', 'higher')}
+
+
+def _calibration_work(iterations=20000):
+    # Fixed pure-Python work in the same style as generate_level (RNG draws,
+    # float math, small dicts) that touches none of this repo's code
+    rng = random.Random(0)
+    out = []
+    for i in range(iterations):
+        x = max(20, min(80, rng.gauss(50, 15)))
+        angle = rng.uniform(0, 2 * math.pi)
+        out.append({'id': i, 'x': round(x, 1), 'dx': round(math.cos(angle) * x, 3)})
+    return out
+
+
+def bench_relative(repeat, levels=200, total_orbs=200):
+    # Generation cost in units of the calibration loop, each timed right after
+    # it within the same repeat. Both sides see the same machine load, so the
+    # median tracks the code under test and not the host.
+    space = list(level_pack.iter_level_space())
+    level_nums = range(1, levels + 1)
+
+    def costs():
+        start = time.perf_counter()
+        _calibration_work()
+        calibration = time.perf_counter() - start
+        start = time.perf_counter()
+        for level_num, bass_style in space:
+            main.generate_level(level_num, bass_style)
+        scalar = time.perf_counter() - start
+        start = time.perf_counter()
+        endless.generate_endless_batch(level_nums, total_orbs)
+        vector = time.perf_counter() - start
+        return scalar / calibration, vector / calibration
+
+    samples = [costs() for _ in range(repeat)]
+    return {
+        'generate_level.relative_cost': _metric(
+            statistics.median(s for s, _ in samples), 'x calibration', 'lower', gated=True),
+        'endless.batch.relative_cost': _metric(
+            statistics.median(v for _, v in samples), 'x calibration', 'lower', gated=True),
+    }
+
+
+# ── Serialization ──────────────────────────────────────────────────────────────
+def bench_encode(repeat, iterations=500):
+    level = main.generate_level(1, STYLE_ORDER[0])
+    encoders = {
+        'json': lambda lv: main.app.json.dumps(lv, separators=(',', ':')),
+        'columns': level_format.encode_columns,
+        'binary': level_format.encode_binary,
+    }
+    results = {}
+    for name, encode in encoders.items():
+        def run(encode=encode):
+            start = time.perf_counter()
+            for _ in range(iterations):
+                encode(level)
+            return time.perf_counter() - start
+
+        elapsed = _median_of(repeat, run)
+        results[f'encode.{name}.us'] = _metric(elapsed / iterations * 1e6, 'us', 'lower')
+        results[f'encode.{name}.bytes'] = _metric(len(encode(level)), 'bytes', 'lower', gated=True)
+    return results
+
+
+# ── Request path ───────────────────────────────────────────────────────────────
+def _level_urls(count):
+    return [f'/api/level/{n}/bass/{STYLE_ORDER[(n - 1) % len(STYLE_ORDER)]}' for n in range(1, count + 1)]
+
+
+def _time_requests(client, urls):
+    samples = []
+    for url in urls:
+        start = time.perf_counter()
+        response = client.get(url)
+        samples.append((time.perf_counter() - start) * 1000)
+        if response.status_code != 200:
+            raise RuntimeError(f'{url} returned {response.status_code}')
+    return samples
+
+
+def bench_request(requests):
+    client = main.app.test_client()
+    urls = _level_urls(requests)
+
+    with _without_level_store() as store:
+        main.level_cache.clear()
+        cold = _time_requests(client, urls)
+        warm = _time_requests(client, urls)
+    results = {
+        'request.cold.p50_ms': _metric(statistics.median(cold), 'ms', 'lower'),
+        'request.warm.p50_ms': _metric(statistics.median(warm), 'ms', 'lower'),
+    }
+    if store is not None:
+        main.level_cache.clear()
+        stored = _time_requests(client, urls)
+        results['request.store.p50_ms'] = _metric(statistics.median(stored), 'ms', 'lower')
+    return results
+
+
+def bench_load(threads, requests):
+    # Local load generator over the level cache, store detached; also checks
+    # every thread sees byte-identical levels
+    with _without_level_store():
+        return _run_load(threads, requests)
+
+
+def _run_load(threads, requests):
+    client = main.app.test_client()
+    urls = _level_urls(len(ORDERED_PATTERNS))
+    main.level_cache.clear()
+    expected = {url: client.get(url).data for url in urls}
+    main.level_cache.clear()
+
+    lock = threading.Lock()
+    samples, mismatches = [], []
+
+    def worker(i):
+        url = urls[i % len(urls)]
+        start = time.perf_counter()
+        body = client.get(url).data
+        elapsed = (time.perf_counter() - start) * 1000
+        with lock:
+            samples.append(elapsed)
+            if body != expected[url]:
+                mismatches.append(url)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(worker, range(requests)))
+    wall = time.perf_counter() - start
+
+    if mismatches:
+        raise RuntimeError(f'{len(mismatches)} responses differed under load, e.g. {mismatches[0]}')
+    return {
+        'load.requests_per_sec': _metric(requests / wall, 'req/s', 'higher'),
+        'load.p50_ms': _metric(_percentile(samples, 50), 'ms', 'lower'),
+        'load.p95_ms': _metric(_percentile(samples, 95), 'ms', 'lower'),
+        'load.p99_ms': _metric(_percentile(samples, 99), 'ms', 'lower'),
+    }
+
+
+# ── Baseline comparison ────────────────────────────────────────────────────────
+def compare(results, baseline, threshold):
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if not current['gated'] or base is None or base['value'] == 0:
+            continue
+        change = (current['value'] - base['value']) / base['value']
+        if current['better'] == 'higher':
+            change = -change
+        if change > threshold:
+            regressions.append((name, base['value'], current['value'], change))
+    return regressions
+
+
+def run(args):
+    results = {}
+    results.update(bench_generate(args.repeat))
+    results.update(bench_endless(args.repeat))
+    results.update(bench_relative(args.repeat))
+    results.update(bench_encode(args.repeat))
+    results.update(bench_request(args.requests))
+    results.update(bench_load(args.threads, args.load_requests))
+    return results
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description='Gem Slap benchmarks')
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--threshold', type=float, default=0.4,
+                        help='allowed fractional regression before failing (default 0.4)')
+    parser.add_argument('--repeat', type=int, default=9)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--load-requests', type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    results = run(args)
+    width = max(len(name) for name in results)
+    for name, metric in results.items():
+        print(f"{name:<{width}}  {metric['value']:>12} {metric['unit']}")
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f'Baseline saved to {args.baseline}')
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print('No baseline to compare against (run with --save-baseline)')
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.threshold)
+    for name, before, after, change in regressions:
+        print(f'REGRESSION {name}: {before} -> {after} ({change:+.0%} worse)')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main_cli())
@@ -0,0 +1,124 @@
+"""
+Gem Slap - Endless Engine
+Vectorized orb generation for endless/marathon levels and bulk analysis.
+
+Every level draws from its own numpy Generator seeded like generate_level
+(level_num * 77), so a level comes out the same whether it is built alone or
+inside a batch of thousands. Clamping, drift and rounding then run as array
+math over the whole batch at once.
+
+This is its own mode: it follows generate_level's musical rules but is not
+byte-compatible with it.
+"""
+import math
+
+import numpy as np
+
+from game_data import (
+    NOTE_COLORS, ORDERED_PATTERNS, PHRASES, PHRASES_BY_TIER, TRANSPOSE_TABLE,
+    VISIBLE_AT_ONCE, BASE_SPEED, get_color, feel_tier,
+)
+
+# ── Phrase content as arrays ───────────────────────────────────────────────────
+PHRASE_KEYS = tuple(k for k, p in PHRASES.items() if len(p['beats']) == VISIBLE_AT_ONCE)
+_PHRASE_INDEX = {key: i for i, key in enumerate(PHRASE_KEYS)}
+PHRASE_NAMES = tuple(PHRASES[k]['name'] for k in PHRASE_KEYS)
+
+_MELODY_COUNTS = np.array([len(PHRASES[k]['melodies']) for k in PHRASE_KEYS])
+# [phrase, melody, beat]; ragged melody lists are padded by repeating the last
+_MELODIES = np.array([
+    list(PHRASES[k]['melodies']) + [PHRASES[k]['melodies'][-1]] * (_MELODY_COUNTS.max() - n)
+    for k, n in zip(PHRASE_KEYS, _MELODY_COUNTS, strict=True)
+], dtype=np.int8)
+_BEATS = np.array([PHRASES[k]['beats'] for k in PHRASE_KEYS], dtype=np.float32)
+
+# Note → transposed note, indexed by note - _NOTE_MIN (notes outside SCALE map to themselves)
+_NOTE_MIN, _NOTE_MAX = min(NOTE_COLORS), max(NOTE_COLORS)
+_TRANSPOSE = {
+    steps: np.array([TRANSPOSE_TABLE[steps].get(n, n) for n in range(_NOTE_MIN, _NOTE_MAX + 1)], dtype=np.int8)
+    for steps in (2, -1)
+}
+_COLOR_PALETTE = tuple(dict.fromkeys(get_color(n) for n in range(_NOTE_MIN, _NOTE_MAX + 1)))
+_COLOR_INDEX = np.array(
+    [_COLOR_PALETTE.index(get_color(n)) for n in range(_NOTE_MIN, _NOTE_MAX + 1)], dtype=np.uint8
+)
+
+DRIFT_SPEED = 0.15 + BASE_SPEED * 1.2
+
+
+def _draw_level(level_num, total_orbs):
+    # All per-level randomness, drawn up front from the level's own Generator
+    rng = np.random.default_rng(level_num * 77)
+    level_in_set = (level_num - 1) % len(ORDERED_PATTERNS) + 1
+    keys = PHRASES_BY_TIER[(VISIBLE_AT_ONCE, feel_tier(level_in_set))]
+    picked = [keys[i] for i in rng.permutation(len(keys))[:3]]
+    selected = np.array([_PHRASE_INDEX[k] for k in (picked + picked)[:3]])
+
+    waves = math.ceil(total_orbs / VISIBLE_AT_ONCE)
+    phrase_per_wave = selected[np.arange(waves) % len(selected)]
+    melody_idx = (rng.random(waves) * _MELODY_COUNTS[phrase_per_wave]).astype(np.intp)
+    notes = _MELODIES[phrase_per_wave, melody_idx]
+
+    # Same shape as generate_level: theme, lifted theme, resolving phrase
+    theme = notes[0].copy()
+    coins = rng.random(3)
+    if waves > 1 and coins[0] > 0.4:
+        notes[1] = _TRANSPOSE[2][theme - _NOTE_MIN]
+    if waves > 2:
+        roots = PHRASES[PHRASE_KEYS[phrase_per_wave[2]]]['rootEndings']
+        if roots and coins[1] > 0.3:
+            notes[2] = roots[int(coins[2] * len(roots))]
+        else:
+            notes[2] = _TRANSPOSE[-1][theme - _NOTE_MIN]
+
+    positions = rng.normal(50, 15, size=(2, total_orbs))
+    uniforms = rng.random(size=(3, total_orbs))
+    return notes.reshape(-1)[:total_orbs], phrase_per_wave, positions, uniforms
+
+
+def generate_endless_batch(level_nums, total_orbs):
+    """Orb columns for many levels at once, each shaped (len(level_nums), total_orbs)."""
+    count = len(level_nums)
+    notes = np.empty((count, total_orbs), dtype=np.int8)
+    phrases = np.empty((count, total_orbs), dtype=np.uint8)
+    positions = np.empty((count, 2, total_orbs))
+    uniforms = np.empty((count, 3, total_orbs))
+
+    orb_idx = np.arange(total_orbs)
+    wave = orb_idx // VISIBLE_AT_ONCE
+    for row, level_num in enumerate(level_nums):
+        row_notes, phrase_per_wave, positions[row], uniforms[row] = _draw_level(level_num, total_orbs)
+        notes[row] = row_notes
+        phrases[row] = phrase_per_wave[wave]
+
+    angle = uniforms[:, 0] * (2 * math.pi)
+    speed = DRIFT_SPEED * (0.7 + 0.6 * uniforms[:, 1])
+    return {
+        'x': np.round(np.clip(positions[:, 0], 20, 80), 1),
+        'y': np.round(np.clip(positions[:, 1], 20, 80), 1),
+        'size': np.round(0.85 + 0.3 * uniforms[:, 2], 2),
+        'driftX': np.round(np.cos(angle) * speed, 3),
+        'driftY': np.round(np.sin(angle) * speed, 3),
+        'note': notes,
+        'color': _COLOR_INDEX[notes - _NOTE_MIN],
+        'phrase': phrases,
+        'phraseBeat': _BEATS[phrases, orb_idx % VISIBLE_AT_ONCE],
+        'wave': np.broadcast_to(wave, (count, total_orbs)),
+    }
+
+
+def batch_orbs(batch, row):
+    """Orb dicts for one level of a batch, in the same shape generate_level returns."""
+    cols = {key: batch[key][row].tolist() for key in batch}
+    return [
+        {
+            'id': i, 'x': x, 'y': y, 'color': _COLOR_PALETTE[color], 'note': note,
+            'size': size, 'driftX': dx, 'driftY': dy,
+            'phraseBeat': beat, 'wave': wave, 'phraseName': PHRASE_NAMES[phrase],
+        }
+        for i, (x, y, color, note, size, dx, dy, beat, wave, phrase) in enumerate(zip(
+            cols['x'], cols['y'], cols['color'], cols['note'], cols['size'],
+            cols['driftX'], cols['driftY'], cols['phraseBeat'], cols['wave'], cols['phrase'],
+            strict=True,
+        ))
+    ]
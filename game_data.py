@@ -9,6 +9,7 @@ Removed levels:
   Cassiopeia, Lyra, Corona Borealis, Scorpius, Swan,
   Compass, Arch, Rocket, Trident, Anchor, Peace Sign, Thumbs Up
 """
+from types import MappingProxyType
 
 PERFECT_WINDOW = 130
 GREAT_WINDOW = 250
@@ -20,6 +21,9 @@ MISS_POINTS = 10
 
 TARGET_DESTROY_RADIUS = 22
 STANDARD_TOTAL_ORBS = 20
+VISIBLE_AT_ONCE = 8
+LEVEL_BPM = 108
+BASE_SPEED = 0.12
 
 SCALE = [-5, -2, 0, 3, 5, 7, 10, 12, 15, 17, 19, 22]
 
@@ -61,6 +65,76 @@ def create_phrase_library():
     return library
 
 
+# ── Compiled phrase content ────────────────────────────────────────────────────
+# Built once at import and frozen, so generate_level only does index lookups.
+#   PHRASES[key]                  → {'beats', 'feel', 'melodies', 'rootEndings', 'name'}
+#   PHRASES_BY_TIER[(len, tier)]  → phrase keys (library order) allowed at that tier
+#   TRANSPOSE_TABLE[steps]        → {note: note moved `steps` scale degrees, clamped}
+FEEL_TIERS = ('chill', 'groove', 'funky')
+ROOT_NOTES = (0, 7, 12)
+
+
+def feel_tier(level_in_set):
+    # Early levels in a set only use chill phrases, then groove joins, then funky
+    if level_in_set <= 10:
+        return 'chill'
+    if level_in_set <= 25:
+        return 'groove'
+    return 'funky'
+
+
+def _validate_phrase(key, phrase):
+    beats, melodies = phrase['beats'], phrase['melodies']
+    if phrase['feel'] not in FEEL_TIERS:
+        raise ValueError(f"phrase {key!r}: unknown feel {phrase['feel']!r}")
+    if not key.endswith(f'_{len(beats)}'):
+        raise ValueError(f'phrase {key!r}: key suffix does not match {len(beats)} beats')
+    if list(beats) != sorted(beats):
+        raise ValueError(f'phrase {key!r}: beats are not in order')
+    if not melodies:
+        raise ValueError(f'phrase {key!r}: no melodies')
+    for melody in melodies:
+        if len(melody) != len(beats):
+            raise ValueError(f'phrase {key!r}: melody {melody} has {len(melody)} notes for {len(beats)} beats')
+        unknown = set(melody) - set(SCALE)
+        if unknown:
+            raise ValueError(f'phrase {key!r}: notes {sorted(unknown)} are not in SCALE')
+
+
+def compile_phrase_library(library):
+    phrases = {}
+    for key, phrase in library.items():
+        _validate_phrase(key, phrase)
+        melodies = tuple(tuple(m) for m in phrase['melodies'])
+        phrases[key] = MappingProxyType({
+            'beats': tuple(phrase['beats']), 'feel': phrase['feel'], 'melodies': melodies,
+            'rootEndings': tuple(m for m in melodies if m[-1] in ROOT_NOTES),
+            'name': key.replace('_', ' ').title(),
+        })
+
+    by_tier = {}
+    for tier_idx, tier in enumerate(FEEL_TIERS):
+        allowed = FEEL_TIERS[:tier_idx + 1]
+        for key, phrase in phrases.items():
+            by_tier.setdefault((len(phrase['beats']), tier), [])
+            if phrase['feel'] in allowed:
+                by_tier[(len(phrase['beats']), tier)].append(key)
+    by_tier = {k: tuple(v) for k, v in by_tier.items()}
+    return MappingProxyType(phrases), MappingProxyType(by_tier)
+
+
+def compile_transpose_table(scale):
+    top = len(scale) - 1
+    return MappingProxyType({
+        steps: MappingProxyType({note: scale[max(0, min(top, idx + steps))] for idx, note in enumerate(scale)})
+        for steps in range(-top, top + 1)
+    })
+
+
+PHRASES, PHRASES_BY_TIER = compile_phrase_library(create_phrase_library())
+TRANSPOSE_TABLE = compile_transpose_table(SCALE)
+TRANSPOSE_MAX_STEPS = len(SCALE) - 1
+
 # 52 levels — removed: Cross, Delta, Parabola, Crux, Eighth Note, Sharp,
 # Beamed Notes, Cassiopeia, Lyra, Corona Borealis, Scorpius, Swan,
 # Compass, Arch, Rocket, Trident, Anchor, Peace Sign, Thumbs Up
@@ -0,0 +1,148 @@
+"""
+Gem Slap - Leaderboard
+Verified scores in a local SQLite database (WAL mode).
+
+Request workers never write: submit() only enqueues, and one background
+writer thread per process drains the queue in batches, one transaction per
+batch. Readers use their own per-thread connections, which WAL lets run
+alongside the writer.
+"""
+import os, queue, sqlite3, threading, time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scores (
+    id         INTEGER PRIMARY KEY,
+    level      INTEGER NOT NULL,
+    bass       INTEGER NOT NULL,
+    name       TEXT    NOT NULL,
+    time_ms    REAL    NOT NULL,
+    points     INTEGER NOT NULL,
+    perfect    INTEGER NOT NULL,
+    great      INTEGER NOT NULL,
+    good       INTEGER NOT NULL,
+    miss       INTEGER NOT NULL,
+    created_at REAL    NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scores_level_rank ON scores (level, time_ms, points DESC);
+CREATE INDEX IF NOT EXISTS scores_level_bass_rank ON scores (level, bass, time_ms, points DESC);
+"""
+
+_INSERT = """
+INSERT INTO scores (level, bass, name, time_ms, points, perfect, great, good, miss, created_at)
+VALUES (:level, :bass, :name, :time_ms, :points, :perfect, :great, :good, :miss, :created_at)
+"""
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_FLUSH_INTERVAL = 0.05
+
+
+class Leaderboard:
+    def __init__(self, path, batch_size=DEFAULT_BATCH_SIZE, flush_interval=DEFAULT_FLUSH_INTERVAL):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.executescript(SCHEMA)
+        return conn
+
+    def _ensure_started(self):
+        # Threads don't survive fork, so the writer starts lazily in each
+        # worker process (and again if this process was forked after start)
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue()
+            self._local = threading.local()
+            self._writer = threading.Thread(target=self._run, name='leaderboard-writer', daemon=True)
+            self._writer.start()
+            self._pid = os.getpid()
+
+    def submit(self, verdict, name):
+        self._ensure_started()
+        ratings = verdict['ratings']
+        self._queue.put({
+            'level': verdict['level'], 'bass': verdict['bassStyle'], 'name': name,
+            'time_ms': verdict['timeMs'], 'points': verdict['points'],
+            'perfect': ratings['perfect'], 'great': ratings['great'],
+            'good': ratings['good'], 'miss': ratings['miss'],
+            'created_at': time.time(),
+        })
+
+    def flush(self):
+        # Block until everything submitted so far is committed
+        self._ensure_started()
+        self._queue.join()
+
+    def _run(self):
+        conn = self._connect()
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self._write(conn, batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, conn, batch):
+        # Nothing may escape here: an exception would kill the writer thread
+        # and leave every later score stuck in the queue, with flush() blocked
+        try:
+            with conn:
+                conn.execute('BEGIN')
+                conn.executemany(_INSERT, batch)
+            return
+        except Exception:
+            pass
+        # Retry row by row so one bad score doesn't take its whole batch with
+        # it; rows that still fail are dropped, since they were already
+        # verified and returned to the players
+        for row in batch:
+            try:
+                conn.execute(_INSERT, row)
+            except Exception:
+                self.dropped += 1
+
+    def _reader(self):
+        self._ensure_started()
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+            conn.row_factory = sqlite3.Row
+        return conn
+
+    def top(self, level, limit=10, bass=None):
+        sql = 'SELECT name, bass, time_ms, points, perfect, great, good, miss, created_at FROM scores WHERE level = ?'
+        params = [level]
+        if bass is not None:
+            sql += ' AND bass = ?'
+            params.append(bass)
+        sql += ' ORDER BY time_ms ASC, points DESC LIMIT ?'
+        params.append(limit)
+        return [
+            {
+                'rank': i + 1, 'name': row['name'], 'bassStyle': row['bass'],
+                'timeMs': row['time_ms'], 'points': row['points'],
+                'ratings': {k: row[k] for k in ('perfect', 'great', 'good', 'miss')},
+                'createdAt': row['created_at'],
+            }
+            for i, row in enumerate(self._reader().execute(sql, params))
+        ]
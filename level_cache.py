@@ -0,0 +1,70 @@
+"""
+Gem Slap - Level Cache
+Bounded LRU cache of encoded level responses.
+
+Levels are deterministic for a given (level, bass style), so the encoded
+JSON body can be built once and replayed for every repeat request.
+"""
+from collections import OrderedDict
+import threading
+
+DEFAULT_MAX_ENTRIES = 2048
+
+
+class LevelCache:
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        if max_entries < 0:
+            raise ValueError('max_entries must be >= 0')
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key):
+        with self._lock:
+            body = self._entries.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def put(self, key, body):
+        if self.max_entries == 0:
+            return
+        with self._lock:
+            self._entries[key] = body
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_build(self, key, build):
+        body = self.get(key)
+        if body is None:
+            # Built outside the lock — two threads racing on a cold key both
+            # produce identical bytes, so the second put is harmless.
+            body = build()
+            self.put(key, body)
+        return body
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._entries), 'maxEntries': self.max_entries,
+                'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+            }
@@ -0,0 +1,68 @@
+"""
+Gem Slap - Level Wire Formats
+Opt-in compact encodings of a generate_level() payload, picked by Accept header.
+
+columns (application/vnd.gemslap.columns+json)
+    Orbs become parallel arrays under 'orbColumns'. Phrase names and colors
+    are dictionary-encoded into 'phraseNames' / 'colors'; orb ids are implicit
+    (0..n-1).
+
+binary (application/vnd.gemslap.level)
+    Little-endian, laid out so every column can be viewed in place:
+        'GSL1'  u32 meta length  meta JSON (space-padded to 4 bytes)
+        f32[n] x, y, size, driftX, driftY, phraseBeat
+        u16[n] wave   i8[n] note   u8[n] phrase, color
+"""
+import json, struct
+
+COLUMNS_MIMETYPE = 'application/vnd.gemslap.columns+json'
+BINARY_MIMETYPE = 'application/vnd.gemslap.level'
+
+BINARY_MAGIC = b'GSL1'
+FLOAT_COLUMNS = ('x', 'y', 'size', 'driftX', 'driftY', 'phraseBeat')
+INT_COLUMNS = (('wave', 'H'), ('note', 'b'), ('phrase', 'B'), ('color', 'B'))
+
+
+def _palette(values):
+    # First-seen order keeps the encoding deterministic
+    return list(dict.fromkeys(values))
+
+
+def to_columns(level):
+    orbs = level['orbs']
+    phrase_names = _palette(o['phraseName'] for o in orbs)
+    colors = _palette(o['color'] for o in orbs)
+    phrase_idx = {name: i for i, name in enumerate(phrase_names)}
+    color_idx = {color: i for i, color in enumerate(colors)}
+
+    columns = {key: [o[key] for o in orbs] for key in FLOAT_COLUMNS + ('note', 'wave')}
+    columns['phrase'] = [phrase_idx[o['phraseName']] for o in orbs]
+    columns['color'] = [color_idx[o['color']] for o in orbs]
+
+    meta = {k: v for k, v in level.items() if k != 'orbs'}
+    return {**meta, 'format': 'columns', 'orbCount': len(orbs),
+            'phraseNames': phrase_names, 'colors': colors, 'orbColumns': columns}
+
+
+def encode_columns(level):
+    return (json.dumps(to_columns(level), separators=(',', ':'), sort_keys=True) + '\n').encode()
+
+
+def encode_binary(level):
+    compact = to_columns(level)
+    columns = compact.pop('orbColumns')
+    compact['format'] = 'binary'
+    n = compact['orbCount']
+
+    meta = json.dumps(compact, separators=(',', ':'), sort_keys=True).encode()
+    meta += b' ' * (-len(meta) % 4)
+    parts = [BINARY_MAGIC, struct.pack('<I', len(meta)), meta]
+    parts += [struct.pack(f'<{n}f', *columns[key]) for key in FLOAT_COLUMNS]
+    parts += [struct.pack(f'<{n}{code}', *columns[key]) for key, code in INT_COLUMNS]
+    return b''.join(parts)
+
+
+ENCODERS = {
+    COLUMNS_MIMETYPE: encode_columns,
+    BINARY_MIMETYPE: encode_binary,
+}
@@ -0,0 +1,52 @@
+"""
+Gem Slap - Level Pack
+Pre-generates every (level, bass style) in the first set into one gzip'd,
+content-hashed bundle the service worker downloads once for offline play.
+
+Built with `flask --app main build-level-pack`.
+"""
+import gzip, hashlib, json, os
+
+from game_data import ORDERED_PATTERNS, BASS_STYLES
+
+PACK_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'levels')
+MANIFEST_NAME = 'manifest.json'
+
+
+def iter_level_space():
+    for level_num in range(1, len(ORDERED_PATTERNS) + 1):
+        for bass_style in BASS_STYLES:
+            yield level_num, bass_style
+
+
+def build_pack(generate_level, out_dir=PACK_DIR):
+    levels = [generate_level(n, b) for n, b in iter_level_space()]
+    payload = json.dumps({'levels': levels}, separators=(',', ':'), sort_keys=True).encode()
+    digest = hashlib.sha256(payload).hexdigest()[:16]
+    filename = f'levels.{digest}.json.gz'
+
+    os.makedirs(out_dir, exist_ok=True)
+    for name in os.listdir(out_dir):
+        if name.startswith('levels.') and name != filename:
+            os.remove(os.path.join(out_dir, name))
+
+    # mtime=0 keeps the compressed bytes stable for identical content
+    with open(os.path.join(out_dir, filename), 'wb') as f:
+        f.write(gzip.compress(payload, compresslevel=9, mtime=0))
+
+    manifest = {
+        'hash': digest, 'file': filename,
+        'levelCount': len(ORDERED_PATTERNS), 'bassStyles': sorted(BASS_STYLES),
+        'size': len(payload),
+    }
+    with open(os.path.join(out_dir, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def load_manifest(pack_dir=PACK_DIR):
+    try:
+        with open(os.path.join(pack_dir, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
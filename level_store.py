@@ -0,0 +1,164 @@
+"""
+Gem Slap - Level Store
+One file of pre-encoded level responses plus an offset index, opened with
+mmap so every gunicorn worker shares the same pages through the OS page cache.
+
+Layout (little-endian):
+    header   'GSLS'  u32 entry count  u32 version length  version (utf-8)
+    index    per entry: u32 level  u16 bass  u8 format  pad  u64 offset  u32 length  32s etag
+    bodies   raw response bytes, back to back
+
+Built with `flask --app main build-level-store`.
+"""
+from collections import namedtuple
+import mmap, os, struct
+
+STORE_MAGIC = b'GSLS'
+_HEADER = struct.Struct('<4sII')
+_ENTRY = struct.Struct('<IHBxQI32s')
+
+StoredLevel = namedtuple('StoredLevel', 'view offset etag')
+
+
+def build_store(path, keys, encode, mimetypes, version):
+    """Encode every (level, bass) in `keys` in each of `mimetypes` into `path`.
+
+    `encode(level_num, bass_style, mimetype)` returns (body, etag). The file is
+    written beside `path` and renamed into place, so running workers keep
+    reading the store they already mapped.
+    """
+    entries, bodies, offset = [], [], 0
+    for level_num, bass_style in keys:
+        for fmt, mimetype in enumerate(mimetypes):
+            body, etag = encode(level_num, bass_style, mimetype)
+            entries.append((level_num, bass_style, fmt, offset, len(body), etag.encode()))
+            bodies.append(body)
+            offset += len(body)
+
+    version = version.encode()
+    data_start = _HEADER.size + len(version) + _ENTRY.size * len(entries)
+    tmp_path = f'{path}.tmp'
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(tmp_path, 'wb') as f:
+        f.write(_HEADER.pack(STORE_MAGIC, len(entries), len(version)))
+        f.write(version)
+        for level_num, bass_style, fmt, body_offset, length, etag in entries:
+            f.write(_ENTRY.pack(level_num, bass_style, fmt, data_start + body_offset, length, etag))
+        for body in bodies:
+            f.write(body)
+    os.replace(tmp_path, path)
+    return len(entries), data_start + offset
+
+
+class StaleStoreError(ValueError):
+    """The file isn't a level store this build can read."""
+
+
+class LevelStore:
+    def __init__(self, path, mimetypes, version=None):
+        """Map the store at `path`, whose format indexes refer to `mimetypes`.
+
+        Raises StaleStoreError if it was built with a different `version` or
+        is corrupt, before any of its index is trusted.
+        """
+        self.path = path
+        with open(path, 'rb') as f:
+            self.inode = os.fstat(f.fileno()).st_ino
+            if os.fstat(f.fileno()).st_size == 0:
+                raise StaleStoreError(f'{path} is empty')
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+        try:
+            self._index = self._read_index(mimetypes, version)
+        except StaleStoreError:
+            self._close()
+            raise
+
+    def _read_index(self, mimetypes, version):
+        if len(self._view) < _HEADER.size:
+            raise StaleStoreError(f'{self.path} is truncated')
+        magic, count, version_len = _HEADER.unpack_from(self._view, 0)
+        if magic != STORE_MAGIC:
+            raise StaleStoreError(f'{self.path} is not a level store')
+        pos = _HEADER.size
+        try:
+            self.version = bytes(self._view[pos:pos + version_len]).decode()
+        except UnicodeDecodeError:
+            raise StaleStoreError(f'{self.path} has a corrupt header') from None
+        if version is not None and self.version != version:
+            raise StaleStoreError(f'{self.path} was built for {self.version!r}, not {version!r}')
+        pos += version_len
+
+        index_end = pos + _ENTRY.size * count
+        if index_end > len(self._view):
+            raise StaleStoreError(f'{self.path} is truncated')
+        index = {}
+        for level_num, bass_style, fmt, offset, length, etag in _ENTRY.iter_unpack(self._view[pos:index_end]):
+            if fmt >= len(mimetypes) or offset + length > len(self._view):
+                raise StaleStoreError(f'{self.path} has a corrupt index')
+            index[(level_num, bass_style, mimetypes[fmt])] = (offset, length, etag.decode())
+        return index
+
+    def _close(self):
+        self._view.release()
+        self._mmap.close()
+
+    def __len__(self):
+        return len(self._index)
+
+    def get(self, key):
+        # (level_num, bass_style, mimetype) → StoredLevel, or None if not stored
+        entry = self._index.get(key)
+        if entry is None:
+            return None
+        offset, length, etag = entry
+        return StoredLevel(self._view[offset:offset + length], offset, etag)
+
+    def open_at(self, stored):
+        """A file object over exactly `stored`'s bytes, for wsgi.file_wrapper/sendfile.
+
+        Returns None if the file on disk has been replaced since it was mapped,
+        since its offsets no longer match this index.
+        """
+        f = open(self.path, 'rb')  # noqa: SIM115 — handed to the WSGI server, which closes it
+        if os.fstat(f.fileno()).st_ino != self.inode:
+            f.close()
+            return None
+        f.seek(stored.offset)
+        return BodyFile(f, len(stored.view))
+
+
+class BodyFile:
+    """Read-only view of `length` bytes from the current position of `f`.
+
+    read() stops at the end of the body, so a generic file wrapper can't run
+    on into the next level; fileno() still exposes the real descriptor,
+    positioned at the body, for servers that sendfile Content-Length bytes.
+    """
+
+    def __init__(self, f, length):
+        self._f = f
+        self._remaining = length
+
+    def read(self, size=-1):
+        if size is None or size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._f.read(size) if size else b''
+        self._remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self._f.fileno()
+
+    def close(self):
+        self._f.close()
+
+
+def open_store(path, mimetypes, version):
+    # None when the store is missing or was built by a different generator
+    if not os.path.exists(path):
+        return None
+    try:
+        return LevelStore(path, mimetypes, version)
+    except StaleStoreError:
+        return None
@@ -1,43 +1,214 @@
 """
 Gem Slap - A Rhythm Game
 """
-from flask import Flask, render_template, jsonify, send_from_directory, make_response, request, redirect
-import random, math, os
+from flask import Flask, render_template, jsonify, send_file, send_from_directory, make_response, request, redirect, g
+import random, math, os, gzip, hashlib, time
 
 from game_data import (
-    SCALE, NOTE_COLORS, get_color,
+    NOTE_COLORS, get_color,
     PERFECT_WINDOW, GREAT_WINDOW, GOOD_WINDOW,
     PERFECT_POINTS, GREAT_POINTS, GOOD_POINTS, MISS_POINTS,
-    TARGET_DESTROY_RADIUS, STANDARD_TOTAL_ORBS,
+    TARGET_DESTROY_RADIUS, STANDARD_TOTAL_ORBS, VISIBLE_AT_ONCE, LEVEL_BPM, BASE_SPEED,
     LEVEL_BATCHES, BASS_STYLES, STYLE_ORDER,
-    create_phrase_library,
+    PHRASES, PHRASES_BY_TIER, TRANSPOSE_TABLE, TRANSPOSE_MAX_STEPS, feel_tier,
 )
+from level_cache import LevelCache, DEFAULT_MAX_ENTRIES
+from level_store import build_store, open_store
+from leaderboard import Leaderboard
+from replay import ReplayError, verify_replay
+import assets
+import level_pack
+import level_format
+import metrics
+import endless
 
 app = Flask(__name__)
 
+MAX_BATCH_LEVELS = 50
+ENDLESS_DEFAULT_ORBS = 200
+MAX_ENDLESS_ORBS = 5000
+
+# Bump whenever generate_level output changes so level ETags change with it
+GENERATOR_VERSION = '1'
+
+level_cache = LevelCache(int(os.environ.get('LEVEL_CACHE_SIZE', DEFAULT_MAX_ENTRIES)))
+# Endless bodies run to ~750 KB at MAX_ENDLESS_ORBS, so they get their own
+# small cache rather than crowding hot standard levels out of level_cache
+ENDLESS_CACHE_SIZE = 64
+endless_cache = LevelCache(int(os.environ.get('ENDLESS_CACHE_SIZE', ENDLESS_CACHE_SIZE)))
+
+# ── Metrics (Prometheus text format at /metrics) ───────────────────────────────
+# Per-level counters stop at this level so endless play can't blow up label
+# cardinality; everything past it, and any unknown bass style, is counted as
+# 'other'.
+METRICS_MAX_LEVEL_LABEL = 500
+
+registry = metrics.Registry()
+REQUEST_SECONDS = registry.histogram(
+    'gemslap_request_duration_seconds', 'Request latency by route.', ['route'])
+RESPONSE_BYTES = registry.histogram(
+    'gemslap_response_size_bytes', 'Buffered response size by route.', ['route'],
+    buckets=metrics.SIZE_BUCKETS)
+RESPONSES = registry.counter(
+    'gemslap_responses_total', 'Responses by route and status code.', ['route', 'status'])
+IN_FLIGHT = registry.gauge(
+    'gemslap_requests_in_flight', 'Requests currently being handled.')
+WWW_REDIRECTS = registry.counter(
+    'gemslap_www_redirects_total', 'Requests redirected from www. to the bare host.')
+LEVEL_REQUESTS = registry.counter(
+    'gemslap_level_requests_total', 'Level requests by level and bass style.', ['level', 'bass'])
+GENERATE_SECONDS = registry.histogram(
+    'gemslap_generate_level_seconds', 'Time spent in generate_level.')
+GENERATE_ENDLESS_SECONDS = registry.histogram(
+    'gemslap_generate_endless_level_seconds', 'Time spent in generate_endless_level.')
+ENCODE_SECONDS = registry.histogram(
+    'gemslap_encode_level_seconds', 'Time spent encoding a generated level.', ['format'])
+REPLAYS = registry.counter(
+    'gemslap_replays_total', 'Submitted replays by verification result.', ['result'])
+registry.gauge(
+    'gemslap_level_cache', 'Level cache size and counters.', ['stat'],
+    collect=lambda: {(k,): v for k, v in level_cache.stats().items()})
+registry.gauge(
+    'gemslap_endless_cache', 'Endless level cache size and counters.', ['stat'],
+    collect=lambda: {(k,): v for k, v in endless_cache.stats().items()})
+
+slow_ms = os.environ.get('METRICS_PROFILE_SLOW_MS')
+# The sampler thread starts on the first request in each worker process
+profiler = metrics.SlowRequestProfiler(float(slow_ms)) if slow_ms else None
+
+@app.before_request
+def start_request_metrics():
+    g.request_start = time.perf_counter()
+    IN_FLIGHT.inc()
+    if profiler is not None:
+        profiler.begin()
+
+@app.after_request
+def record_request_metrics(response):
+    # Registered before add_header, so it runs after it and sees the final
+    # status and body (e.g. a 304)
+    elapsed = time.perf_counter() - g.request_start
+    route = request.endpoint or 'unmatched'
+    REQUEST_SECONDS.observe(route, value=elapsed)
+    RESPONSES.inc(route, response.status_code)
+    if not response.is_streamed and response.content_length is not None:
+        RESPONSE_BYTES.observe(route, value=response.content_length)
+    if profiler is not None:
+        stacks = profiler.end(elapsed * 1000)
+        if stacks:
+            app.logger.warning('Slow request %s %.1f ms, hottest stacks:\n%s', request.path, elapsed * 1000,
+                               '\n'.join(f'{count:5d} {stack}' for stack, count in stacks))
+    return response
+
+@app.teardown_request
+def finish_request_metrics(_exc):
+    if 'request_start' in g:
+        IN_FLIGHT.dec()
+
 @app.before_request
 def redirect_www():
     if request.host.startswith('www.'):
+        WWW_REDIRECTS.inc()
         return redirect(
             request.url.replace('://www.', '://', 1),
             code=301
         )
 
+# ── Per-route cache policy ─────────────────────────────────────────────────────
+NO_STORE = 'no-store, no-cache, must-revalidate, max-age=0'
+REVALIDATE = 'no-cache'
+ONE_DAY = 'public, max-age=86400'
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+# Endpoints not listed here revalidate on every use (ETag → 304)
+CACHE_POLICIES = {
+    'service_worker': NO_STORE,
+    'get_metrics': NO_STORE,
+    'submit_replay': NO_STORE,
+    'get_level': ONE_DAY,
+    'get_level_with_bass': ONE_DAY,
+    'get_levels': ONE_DAY,
+    'get_endless_level': ONE_DAY,
+    'get_level_pack': IMMUTABLE,
+    'get_asset': IMMUTABLE,
+    'get_bass_styles': ONE_DAY,
+    'get_batches': ONE_DAY,
+    'favicon': ONE_DAY,
+    'robots': ONE_DAY,
+    'sitemap': ONE_DAY,
+}
+STATIC_IMAGE_EXTS = ('.png', '.ico')
+
+def cache_policy(endpoint, path):
+    if endpoint == 'static' and path.endswith(STATIC_IMAGE_EXTS):
+        return ONE_DAY
+    return CACHE_POLICIES.get(endpoint, REVALIDATE)
+
 @app.after_request
 def add_header(response):
-    response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
-    response.headers['Pragma'] = 'no-cache'
-    response.headers['Expires'] = '0'
+    if response.status_code >= 400:
+        response.headers['Cache-Control'] = NO_STORE
+        return response
+
+    policy = cache_policy(request.endpoint, request.path)
+    response.headers['Cache-Control'] = policy
+    if policy == NO_STORE:
+        response.headers['Pragma'] = 'no-cache'
+        response.headers['Expires'] = '0'
+        return response
+
+    # Conditional GET: level routes carry a precomputed ETag, everything else
+    # buffered gets one hashed from its body
+    if request.method in ('GET', 'HEAD') and response.status_code == 200:
+        if 'ETag' not in response.headers and not response.is_streamed:
+            response.add_etag()
+        if 'ETag' in response.headers:
+            response = response.make_conditional(request)
+    return response
+
+
+# ── Built front-end: hashed, minified, precompressed (see assets.py) ─────────
+# ASSET_PIPELINE=0 serves the unbuilt sources instead, for front-end work
+ASSET_PIPELINE = os.environ.get('ASSET_PIPELINE', '1') != '0'
+asset_manifest = assets.load_manifest() if ASSET_PIPELINE else None
+
+def asset_response(entry):
+    # Serve the best precompressed variant of a manifest entry
+    encoding, suffix = assets.pick_encoding(entry, request.accept_encodings)
+    response = send_file(
+        os.path.join(assets.ASSET_DIR, entry['file'] + suffix),
+        mimetype=assets.asset_mimetype(entry['file']),
+        etag=f"{entry['etag']}-{encoding}" if encoding else entry['etag'],
+    )
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
     return response
 
+@app.route('/assets/<filename>')
+def get_asset(filename):
+    entry = asset_manifest and asset_manifest['scripts'].get(filename)
+    if not entry:
+        return jsonify({'error': 'unknown asset'}), 404
+    return asset_response(entry)
+
+@app.cli.command('build-assets')
+def build_assets():
+    manifest = assets.build_assets(lambda urls: render_template('index.html', asset_urls=urls))
+    for entry in (*manifest['scripts'].values(), manifest['index'], manifest['serviceWorker']):
+        sizes = ', '.join(f'{enc} {size}' for enc, size in entry['encodings'].items())
+        print(f"Wrote {entry['file']} ({entry['size']} bytes; {sizes})")
+
 
-# ── Service worker must be served from root scope with no-cache headers ────────
+# ── Service worker must be served from root scope with no-store headers ────────
 @app.route('/service-worker.js')
 def service_worker():
-    response = make_response(
-        send_from_directory(os.path.join(app.root_path, 'static'), 'service-worker.js')
-    )
-    response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
+    if asset_manifest is not None:
+        response = asset_response(asset_manifest['serviceWorker'])
+    else:
+        response = make_response(
+            send_from_directory(os.path.join(app.root_path, 'static'), 'service-worker.js')
+        )
     response.headers['Service-Worker-Allowed'] = '/'
     return response
 
@@ -76,20 +247,13 @@ def terms():
 
 
 def transpose_in_scale(melody, steps):
-    result = []
-    for note in melody:
-        try:
-            idx = SCALE.index(note)
-            new_idx = max(0, min(len(SCALE) - 1, idx + steps))
-            result.append(SCALE[new_idx])
-        except ValueError:
-            result.append(note)
-    return result
+    # Notes outside SCALE pass through unchanged
+    table = TRANSPOSE_TABLE[max(-TRANSPOSE_MAX_STEPS, min(TRANSPOSE_MAX_STEPS, steps))]
+    return [table.get(note, note) for note in melody]
 
 
-def generate_level(level_num, bass_style=None):
-    random.seed(level_num * 77)
-
+def level_meta(level_num, bass_style=None, total_orbs=STANDARD_TOTAL_ORBS):
+    # Everything in a level payload except the orbs
     # ── Flat pattern indexing over all levels ──────────────────────────────────
     all_patterns = LEVEL_BATCHES[0]['patterns']
     total_patterns = len(all_patterns)
@@ -98,95 +262,345 @@ def generate_level(level_num, bass_style=None):
     set_num = (level_num - 1) // total_patterns
 
     batch = LEVEL_BATCHES[0]
-
-    visible_at_once = 8
-    total_orbs = STANDARD_TOTAL_ORBS
-    bpm = 108
-    base_speed = 0.12
     target_time = total_orbs * 1.5
 
     # ── Bass style: provided override or cycle through rotation ───────────────
     num_styles = len(STYLE_ORDER)
     current_bass = bass_style if bass_style is not None else STYLE_ORDER[(level_num - 1) % num_styles]
 
+    pattern = all_patterns[pattern_idx]
+    targets = [{'id': i, 'x': c['x'], 'y': c['y']} for i, c in enumerate(pattern['cells'])]
+
+    return {
+        'level': level_num, 'levelInSet': level_in_set, 'setNum': set_num,
+        'batchName': batch['name'],
+        'bpm': LEVEL_BPM, 'bassStyle': current_bass,
+        'speed': round(BASE_SPEED, 2), 'targetTime': round(target_time, 1),
+        'visibleAtOnce': VISIBLE_AT_ONCE, 'totalOrbs': total_orbs,
+        'timing': {'perfect': PERFECT_WINDOW, 'great': GREAT_WINDOW, 'good': GOOD_WINDOW},
+        'points': {'perfect': PERFECT_POINTS, 'great': GREAT_POINTS, 'good': GOOD_POINTS, 'miss': MISS_POINTS},
+        'targets': targets, 'targetDestroyRadius': TARGET_DESTROY_RADIUS,
+        'patternName': pattern['name'],
+    }
+
+
+@GENERATE_SECONDS.time()
+def generate_level(level_num, bass_style=None):
+    # Private RNG per call — seeding the shared module RNG lets concurrent
+    # requests interleave draws under threaded workers.
+    rng = random.Random(level_num * 77)
+
+    meta = level_meta(level_num, bass_style)
+    total_orbs = meta['totalOrbs']
+
     # ── Phrase feel selection ──────────────────────────────────────────────────
-    phrase_lib = create_phrase_library()
-    suffix = f'_{visible_at_once}'
-    available = {k: v for k, v in phrase_lib.items() if k.endswith(suffix)}
-    if level_in_set <= 10:
-        available = {k: v for k, v in available.items() if v['feel'] == 'chill'}
-    elif level_in_set <= 25:
-        available = {k: v for k, v in available.items() if v['feel'] in ['chill', 'groove']}
-    keys = list(available.keys())
-    random.shuffle(keys)
+    keys = list(PHRASES_BY_TIER[(VISIBLE_AT_ONCE, feel_tier(meta['levelInSet']))])
+    rng.shuffle(keys)
     selected = (keys[:3] + keys[:3])[:3]
-    theme_melody = random.choice(available[selected[0]]['melodies'])
+    theme_melody = rng.choice(PHRASES[selected[0]]['melodies'])
 
     orbs = []
     orb_id = 0
     wave = 0
     while len(orbs) < total_orbs:
         phrase_key = selected[wave % len(selected)]
-        phrase = available[phrase_key]
+        phrase = PHRASES[phrase_key]
         beats = phrase['beats']
         if wave == 0:
             melody = theme_melody
         elif wave == 1:
-            melody = transpose_in_scale(theme_melody, 2) if random.random() > 0.4 else random.choice(phrase['melodies'])
+            melody = transpose_in_scale(theme_melody, 2) if rng.random() > 0.4 else rng.choice(phrase['melodies'])
         elif wave == 2:
-            root_endings = [m for m in phrase['melodies'] if m[-1] in [0, 7, 12]]
-            melody = random.choice(root_endings) if root_endings and random.random() > 0.3 else transpose_in_scale(theme_melody, -1)
+            root_endings = phrase['rootEndings']
+            melody = rng.choice(root_endings) if root_endings and rng.random() > 0.3 else transpose_in_scale(theme_melody, -1)
         else:
-            melody = random.choice(phrase['melodies'])
+            melody = rng.choice(phrase['melodies'])
 
         remaining = total_orbs - len(orbs)
-        count = min(visible_at_once, remaining)
+        count = min(VISIBLE_AT_ONCE, remaining)
         for i in range(count):
             note = melody[i % len(melody)]
             beat = beats[i % len(beats)]
-            x = max(20, min(80, random.gauss(50, 15)))
-            y = max(20, min(80, random.gauss(50, 15)))
-            angle = random.uniform(0, 2 * math.pi)
-            speed = (0.15 + base_speed * 1.2) * random.uniform(0.7, 1.3)
+            x = max(20, min(80, rng.gauss(50, 15)))
+            y = max(20, min(80, rng.gauss(50, 15)))
+            angle = rng.uniform(0, 2 * math.pi)
+            speed = (0.15 + BASE_SPEED * 1.2) * rng.uniform(0.7, 1.3)
             orbs.append({
                 'id': orb_id, 'x': round(x, 1), 'y': round(y, 1),
                 'color': get_color(note), 'note': note,
-                'size': round(random.uniform(0.85, 1.15), 2),
+                'size': round(rng.uniform(0.85, 1.15), 2),
                 'driftX': round(math.cos(angle) * speed, 3),
                 'driftY': round(math.sin(angle) * speed, 3),
                 'phraseBeat': beat, 'wave': wave,
-                'phraseName': phrase_key.replace('_', ' ').title(),
+                'phraseName': phrase['name'],
             })
             orb_id += 1
         wave += 1
 
-    pattern = all_patterns[pattern_idx]
-    targets = [{'id': i, 'x': c['x'], 'y': c['y']} for i, c in enumerate(pattern['cells'])]
+    return {**meta, 'orbs': orbs}
+
 
+JSON_MIMETYPE = 'application/json'
+LEVEL_MIMETYPES = [JSON_MIMETYPE, *level_format.ENCODERS]
+
+
+def encode_level(level_num, bass_style, mimetype=JSON_MIMETYPE):
+    return encode_payload(generate_level(level_num, bass_style), mimetype)
+
+
+def encode_payload(level, mimetype=JSON_MIMETYPE):
+    # Default is a compact, single-line encoding matching jsonify() outside
+    # debug mode. Returns (body, strong ETag over generator version + body).
+    start = time.perf_counter()
+    if mimetype == JSON_MIMETYPE:
+        body = (app.json.dumps(level, separators=(',', ':')) + '\n').encode()
+    else:
+        body = level_format.ENCODERS[mimetype](level)
+    ENCODE_SECONDS.observe(mimetype, value=time.perf_counter() - start)
+    etag = hashlib.sha256(GENERATOR_VERSION.encode() + b':' + body).hexdigest()[:32]
+    return body, etag
+
+
+def default_bass_style(level_num):
+    return STYLE_ORDER[(level_num - 1) % len(STYLE_ORDER)]
+
+
+# ── Shared level store (built by `flask --app main build-level-store`) ─────────
+# Opened at import, so under `gunicorn --preload` the mapping is made once in
+# the master and shared by every forked worker.
+LEVEL_STORE_PATH = os.environ.get('LEVEL_STORE_PATH', os.path.join(app.instance_path, 'levels.store'))
+LEVEL_STORE_SENDFILE = os.environ.get('LEVEL_STORE_SENDFILE', '1') != '0'
+LEVEL_STORE_VERSION = f"{GENERATOR_VERSION}:{','.join(LEVEL_MIMETYPES)}"
+
+level_store = open_store(LEVEL_STORE_PATH, LEVEL_MIMETYPES, LEVEL_STORE_VERSION)
+
+
+def get_encoded_level(level_num, bass_style=None, mimetype=JSON_MIMETYPE):
+    # The rotation default produces the same level as asking for it explicitly,
+    # so both routes share one cache entry.
+    if bass_style is None:
+        bass_style = default_bass_style(level_num)
+    if level_store is not None:
+        stored = level_store.get((level_num, bass_style, mimetype))
+        if stored is not None:
+            return bytes(stored.view), stored.etag
+    return level_cache.get_or_build(
+        (level_num, bass_style, mimetype),
+        lambda: encode_level(level_num, bass_style, mimetype)
+    )
+
+
+def level_response(body, etag=None, mimetype=JSON_MIMETYPE):
+    response = app.response_class(body, mimetype=mimetype)
+    if etag is not None:
+        response.set_etag(etag)
+    return response
+
+
+def negotiated_mimetype():
+    # JSON unless the client explicitly prefers a compact format
+    return request.accept_mimetypes.best_match(LEVEL_MIMETYPES) or JSON_MIMETYPE
+
+
+def stored_level_response(stored, mimetype):
+    # sendfile straight from the store when the server offers a file wrapper
+    # (gunicorn does); otherwise copy the slice out of the shared mapping.
+    # open_at caps reads at the body, so wrappers that just read() to EOF
+    # stop there too.
+    file_wrapper = request.environ.get('wsgi.file_wrapper')
+    f = level_store.open_at(stored) if file_wrapper and LEVEL_STORE_SENDFILE else None
+    if f is None:
+        return level_response(bytes(stored.view), stored.etag, mimetype)
+    response = app.response_class(file_wrapper(f), mimetype=mimetype, direct_passthrough=True)
+    response.content_length = len(stored.view)
+    response.set_etag(stored.etag)
+    return response
+
+
+def negotiated_level_response(level_num, bass_style=None):
+    if bass_style is None:
+        bass_style = default_bass_style(level_num)
+    LEVEL_REQUESTS.inc(level_num if level_num <= METRICS_MAX_LEVEL_LABEL else 'other',
+                       bass_style if bass_style in BASS_STYLES else 'other')
+    mimetype = negotiated_mimetype()
+    stored = level_store.get((level_num, bass_style, mimetype)) if level_store is not None else None
+    if stored is not None:
+        response = stored_level_response(stored, mimetype)
+    else:
+        body, etag = get_encoded_level(level_num, bass_style, mimetype)
+        response = level_response(body, etag, mimetype)
+    response.vary.add('Accept')
+    return response
+
+
+@GENERATE_ENDLESS_SECONDS.time()
+def generate_endless_level(level_num, total_orbs=ENDLESS_DEFAULT_ORBS, bass_style=None):
+    batch = endless.generate_endless_batch([level_num], total_orbs)
     return {
-        'level': level_num, 'levelInSet': level_in_set, 'setNum': set_num,
-        'batchName': batch['name'],
-        'orbs': orbs, 'bpm': bpm, 'bassStyle': current_bass,
-        'speed': round(base_speed, 2), 'targetTime': round(target_time, 1),
-        'visibleAtOnce': visible_at_once, 'totalOrbs': total_orbs,
-        'timing': {'perfect': PERFECT_WINDOW, 'great': GREAT_WINDOW, 'good': GOOD_WINDOW},
-        'points': {'perfect': PERFECT_POINTS, 'great': GREAT_POINTS, 'good': GOOD_POINTS, 'miss': MISS_POINTS},
-        'targets': targets, 'targetDestroyRadius': TARGET_DESTROY_RADIUS,
-        'patternName': pattern['name'],
+        **level_meta(level_num, bass_style, total_orbs),
+        'mode': 'endless', 'orbs': endless.batch_orbs(batch, 0),
     }
 
 
 @app.route('/')
 def index():
-    return render_template('index.html')
+    # Rendered once per deploy by build-assets; unbuilt trees render live
+    if asset_manifest is not None:
+        return asset_response(asset_manifest['index'])
+    return render_template('index.html', asset_urls=assets.SOURCE_URLS)
 
 @app.route('/api/level/<int:level_num>')
 def get_level(level_num):
-    return jsonify(generate_level(level_num))
+    return negotiated_level_response(level_num)
 
 @app.route('/api/level/<int:level_num>/bass/<int:bass_style>')
 def get_level_with_bass(level_num, bass_style):
-    return jsonify(generate_level(level_num, bass_style))
+    return negotiated_level_response(level_num, bass_style)
+
+@app.route('/api/endless/<int:level_num>')
+def get_endless_level(level_num):
+    # Marathon levels: ?orbs=K (default 200) [&bass=B]
+    total_orbs = request.args.get('orbs', ENDLESS_DEFAULT_ORBS, type=int)
+    bass_style = request.args.get('bass', type=int)
+    if level_num < 1:
+        return jsonify({'error': 'level must be >= 1'}), 400
+    if not 1 <= total_orbs <= MAX_ENDLESS_ORBS:
+        return jsonify({'error': f'orbs must be between 1 and {MAX_ENDLESS_ORBS}'}), 400
+    if bass_style is None:
+        bass_style = default_bass_style(level_num)
+    elif bass_style not in BASS_STYLES:
+        return jsonify({'error': 'unknown bass style'}), 400
+
+    mimetype = negotiated_mimetype()
+    body, etag = endless_cache.get_or_build(
+        (level_num, bass_style, total_orbs, mimetype),
+        lambda: encode_payload(generate_endless_level(level_num, total_orbs, bass_style), mimetype)
+    )
+    response = level_response(body, etag, mimetype)
+    response.vary.add('Accept')
+    return response
+
+@app.route('/api/levels')
+def get_levels():
+    # Range request: ?from=N&count=K[&bass=B][&format=ndjson]
+    # Without bass, each level uses its own rotation style.
+    first = request.args.get('from', type=int)
+    count = request.args.get('count', 20, type=int)
+    bass_style = request.args.get('bass', type=int)
+    if first is None or first < 1:
+        return jsonify({'error': 'from must be a level number >= 1'}), 400
+    if not 1 <= count <= MAX_BATCH_LEVELS:
+        return jsonify({'error': f'count must be between 1 and {MAX_BATCH_LEVELS}'}), 400
+    if bass_style is not None and bass_style not in BASS_STYLES:
+        return jsonify({'error': 'unknown bass style'}), 400
+
+    level_nums = range(first, first + count)
+    ndjson = (request.args.get('format') == 'ndjson'
+              or request.accept_mimetypes.best == 'application/x-ndjson')
+    if ndjson:
+        # Each cached body is one line, so levels stream out as they are built
+        def stream():
+            for n in level_nums:
+                yield get_encoded_level(n, bass_style)[0]
+        response = app.response_class(stream(), mimetype='application/x-ndjson')
+    else:
+        bodies = [get_encoded_level(n, bass_style)[0].rstrip(b'\n') for n in level_nums]
+        response = level_response(b'[' + b','.join(bodies) + b']\n')
+    # Same URL, two body shapes: shared caches must key on Accept
+    response.vary.add('Accept')
+    return response
+
+# ── Build commands: offline level pack and shared level store ─────────────────
+@app.cli.command('build-level-pack')
+def build_level_pack():
+    manifest = level_pack.build_pack(generate_level)
+    print(f"Wrote {manifest['file']} ({manifest['size']} bytes uncompressed)")
+
+@app.cli.command('build-level-store')
+def build_level_store():
+    entries, size = build_store(
+        LEVEL_STORE_PATH, level_pack.iter_level_space(), encode_level,
+        LEVEL_MIMETYPES, LEVEL_STORE_VERSION,
+    )
+    print(f'Wrote {entries} responses to {LEVEL_STORE_PATH} ({size} bytes)')
+
+@app.route('/api/level_pack')
+def get_level_pack_manifest():
+    manifest = level_pack.load_manifest()
+    if manifest is None:
+        return jsonify({'error': 'level pack not built'}), 404
+    return jsonify({**manifest, 'url': f"/level-pack/{manifest['hash']}.json"})
+
+@app.route('/level-pack/<pack_hash>.json')
+def get_level_pack(pack_hash):
+    manifest = level_pack.load_manifest()
+    if manifest is None or manifest['hash'] != pack_hash:
+        return jsonify({'error': 'unknown level pack'}), 404
+    if 'gzip' in request.accept_encodings:
+        response = make_response(send_from_directory(
+            level_pack.PACK_DIR, manifest['file'], mimetype='application/json'
+        ))
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        with open(os.path.join(level_pack.PACK_DIR, manifest['file']), 'rb') as f:
+            response = level_response(gzip.decompress(f.read()))
+    response.vary.add('Accept-Encoding')
+    return response
+
+# ── Replays and leaderboard ────────────────────────────────────────────────────
+LEADERBOARD_PATH = os.environ.get('LEADERBOARD_PATH', os.path.join(app.instance_path, 'leaderboard.db'))
+LEADERBOARD_MAX_LIMIT = 100
+# Keeps replay levels inside SQLite's signed 64-bit INTEGER with room to spare
+MAX_REPLAY_LEVEL = 2**31 - 1
+MAX_NAME_LENGTH = 24
+MAX_REPLAY_BYTES = 256 * 1024
+
+leaderboard = Leaderboard(LEADERBOARD_PATH)
+
+@app.route('/api/replay', methods=['POST'])
+def submit_replay():
+    # {"level", "bass", "name", "hits": [[orbId, ms], ...], "targets": [[targetId, ms], ...]}
+    if (request.content_length or 0) > MAX_REPLAY_BYTES:
+        return jsonify({'error': 'replay too large'}), 413
+    replay = request.get_json(silent=True)
+    if not isinstance(replay, dict):
+        return jsonify({'error': 'replay must be a JSON object'}), 400
+    level_num, bass_style = replay.get('level'), replay.get('bass')
+    if type(level_num) is not int or not 1 <= level_num <= MAX_REPLAY_LEVEL:
+        return jsonify({'error': f'level must be between 1 and {MAX_REPLAY_LEVEL}'}), 400
+    if type(bass_style) is not int or bass_style not in BASS_STYLES:
+        return jsonify({'error': 'unknown bass style'}), 400
+
+    try:
+        verdict = verify_replay(generate_level(level_num, bass_style), replay)
+    except ReplayError as e:
+        REPLAYS.inc('rejected')
+        return jsonify({'error': str(e)}), 400
+
+    name = str(replay.get('name') or '').strip()[:MAX_NAME_LENGTH] or 'anonymous'
+    if verdict['cleared']:
+        leaderboard.submit(verdict, name)
+    REPLAYS.inc('cleared' if verdict['cleared'] else 'failed')
+    return jsonify({**verdict, 'name': name, 'queued': verdict['cleared']}), 202
+
+@app.route('/api/leaderboard/<int:level_num>')
+def get_leaderboard(level_num):
+    limit = request.args.get('limit', 10, type=int)
+    bass_style = request.args.get('bass', type=int)
+    if not 1 <= level_num <= MAX_REPLAY_LEVEL:
+        return jsonify({'error': f'level must be between 1 and {MAX_REPLAY_LEVEL}'}), 400
+    if not 1 <= limit <= LEADERBOARD_MAX_LIMIT:
+        return jsonify({'error': f'limit must be between 1 and {LEADERBOARD_MAX_LIMIT}'}), 400
+    if bass_style is not None and bass_style not in BASS_STYLES:
+        return jsonify({'error': 'unknown bass style'}), 400
+    return jsonify({
+        'level': level_num, 'bassStyle': bass_style,
+        'scores': leaderboard.top(level_num, limit, bass_style),
+    })
+
+@app.route('/metrics')
+def get_metrics():
+    return app.response_class(registry.render(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/api/bass_styles')
 def get_bass_styles():
@@ -0,0 +1,239 @@
+"""
+Gem Slap - Metrics
+Minimal Prometheus text-format counters, gauges and histograms, plus an
+opt-in sampling profiler for slow requests.
+
+Each metric keeps its own lock and a dict of label values, so recording is
+a dict update and a bisect — cheap enough to leave on under full load.
+"""
+from bisect import bisect_left
+from collections import Counter as _Tally
+import functools, os, sys, threading, time
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values, strict=True)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped, strict=True)) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if len(labels) != len(self.labels):
+            raise ValueError(f'{self.name} expects labels {self.labels}')
+        return tuple(str(v) for v in labels)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            items = sorted((key, self._snapshot(value)) for key, value in self._values.items())
+        for key, value in items:
+            lines.extend(self._render_sample(key, value))
+        return lines
+
+    def _snapshot(self, value):
+        return value
+
+    def _render_sample(self, key, value):
+        return [f'{self.name}{_format_labels(self.labels, key)} {_format_value(value)}']
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def __init__(self, name, help_text, labels=(), collect=None):
+        super().__init__(name, help_text, labels)
+        # Optional callback returning {label tuple: value}, read at scrape time
+        self._collect = collect
+
+    def inc(self, *labels, amount=1):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels, value):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def render(self):
+        if self._collect is not None:
+            for key, value in self._collect().items():
+                self.set(*key, value=value)
+        return super().render()
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, *labels, value):
+        key = self._key(labels)
+        idx = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket counts (non-cumulative) + overflow, then sum
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][idx] += 1
+            state[1] += value
+
+    def time(self, *labels):
+        # Decorator recording the wrapped call's duration in seconds
+        def decorate(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.observe(*labels, value=time.perf_counter() - start)
+            return wrapper
+        return decorate
+
+    def _snapshot(self, value):
+        return [value[0][:], value[1]]
+
+    def _render_sample(self, key, value):
+        counts, total = value
+        lines, running = [], 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts, strict=True):
+            running += count
+            labels = _format_labels(self.labels, key, [('le', _format_value(bound))])
+            lines.append(f'{self.name}_bucket{labels} {running}')
+        plain = _format_labels(self.labels, key)
+        lines.append(f'{self.name}_sum{plain} {_format_value(total)}')
+        lines.append(f'{self.name}_count{plain} {running}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, *args, **kwargs):
+        return self.register(Counter(*args, **kwargs))
+
+    def gauge(self, *args, **kwargs):
+        return self.register(Gauge(*args, **kwargs))
+
+    def histogram(self, *args, **kwargs):
+        return self.register(Histogram(*args, **kwargs))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+# ── Slow-request sampling profiler ─────────────────────────────────────────────
+class SlowRequestProfiler:
+    """Samples the stacks of in-flight request threads on a background thread.
+
+    Only requests slower than `slow_ms` are reported; everything else just
+    drops its samples. Off unless explicitly constructed; the sampler thread
+    starts with the first request.
+    """
+
+    def __init__(self, slow_ms, interval_ms=10, max_depth=30, top=5):
+        self.slow_ms = slow_ms
+        self.interval = interval_ms / 1000
+        self.max_depth = max_depth
+        self.top = top
+        self._active = {}
+        self._lock = threading.Lock()
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        # Threads don't survive fork, so the sampler starts lazily in each
+        # worker process (and again if this process was forked after start,
+        # as under gunicorn --preload)
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._active = {}
+            self._lock = threading.Lock()
+            threading.Thread(target=self._run, name='slow-request-profiler', daemon=True).start()
+            self._pid = os.getpid()
+
+    def begin(self):
+        self.start()
+        with self._lock:
+            self._active[threading.get_ident()] = _Tally()
+
+    def end(self, elapsed_ms):
+        # Returns the hottest collapsed stacks if this request was slow
+        with self._lock:
+            samples = self._active.pop(threading.get_ident(), None)
+        if samples is None or elapsed_ms < self.slow_ms:
+            return None
+        return samples.most_common(self.top)
+
+    def _collapse(self, frame):
+        parts = []
+        while frame is not None and len(parts) < self.max_depth:
+            code = frame.f_code
+            parts.append(f'{code.co_filename.rsplit("/", 1)[-1]}:{code.co_name}:{frame.f_lineno}')
+            frame = frame.f_back
+        return ';'.join(reversed(parts))
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                idents = list(self._active)
+            if not idents:
+                continue
+            frames = sys._current_frames()
+            for ident in idents:
+                frame = frames.get(ident)
+                if frame is None:
+                    continue
+                stack = self._collapse(frame)
+                with self._lock:
+                    samples = self._active.get(ident)
+                    if samples is not None:
+                        samples[stack] += 1
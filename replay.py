@@ -0,0 +1,136 @@
+"""
+Gem Slap - Replay Verification
+Re-judges a submitted replay against the deterministic level from
+generate_level, so leaderboard scores never trust the client's own scoring.
+
+A replay is compact:
+    {"level": 12, "bass": 4, "name": "...",
+     "hits":    [[orbId, ms], ...],
+     "targets": [[targetId, ms], ...]}
+Times are ms since the beat clock started (the client's state.startTime);
+the first downbeat lands LEAD_IN_BEATS later, matching startCountdown().
+
+Beyond the timing windows, a replay has to be playable: orbs spawn in id
+order, the first visibleAtOnce staggered INITIAL_SPAWN_STAGGER_MS apart and
+each later one only once an earlier orb has been hit (spawnInitialOrbs() and
+trySpawnNext()), and no clear may beat min_clear_ms().
+"""
+import numpy as np
+
+from game_data import (
+    BASS_STYLES, PERFECT_WINDOW, GREAT_WINDOW, GOOD_WINDOW,
+    PERFECT_POINTS, GREAT_POINTS, GOOD_POINTS, MISS_POINTS,
+)
+
+LEAD_IN_BEATS = 0.75
+MAX_REPLAY_MS = 10 * 60 * 1000
+# A target is destroyed by the hit that lands on it, so both share a timestamp
+TARGET_HIT_TOLERANCE_MS = 1.0
+# spawnInitialOrbs() releases the opening orbs this far apart; the slack
+# covers the beat clock starting a little after the first spawn
+INITIAL_SPAWN_STAGGER_MS = 250
+SPAWN_TOLERANCE_MS = 250
+# Fastest allowed clear: the first downbeat plus half a beat per target.
+# Loose on purpose; the quickest real clears (Wrecking Ball, all crystals in
+# under 8 s) sit well above it
+MIN_CLEAR_BEATS_PER_TARGET = 0.5
+
+RATINGS = ('perfect', 'great', 'good', 'miss')
+_WINDOWS = np.array([PERFECT_WINDOW, GREAT_WINDOW, GOOD_WINDOW], dtype=np.float64)
+_POINTS = np.array([PERFECT_POINTS, GREAT_POINTS, GOOD_POINTS, MISS_POINTS])
+
+
+class ReplayError(ValueError):
+    pass
+
+
+def _events(raw, name, valid_ids):
+    if not isinstance(raw, list):
+        raise ReplayError(f'{name} must be a list of [id, ms] pairs')
+    try:
+        events = np.array(raw, dtype=np.float64).reshape(-1, 2)
+    except (TypeError, ValueError):
+        raise ReplayError(f'{name} must be a list of [id, ms] pairs') from None
+    if len(events) != len(raw):
+        raise ReplayError(f'{name} must be a list of [id, ms] pairs')
+
+    ids, times = events[:, 0], events[:, 1]
+    if not np.all(np.isfinite(events)) or np.any(ids != np.floor(ids)):
+        raise ReplayError(f'{name} ids and times must be finite numbers')
+    ids = ids.astype(np.int64)
+    if np.any((ids < 0) | (ids >= valid_ids)):
+        raise ReplayError(f'{name} reference unknown ids')
+    if len(np.unique(ids)) != len(ids):
+        raise ReplayError(f'{name} contain duplicate ids')
+    if np.any((times < 0) | (times > MAX_REPLAY_MS)):
+        raise ReplayError(f'{name} times are out of range')
+    return ids, times
+
+
+def judge_hits(phrase_beats, times_ms, bpm):
+    """Rating index (into RATINGS) per hit — getRating() from the client, vectorized."""
+    measure_ms = 60000 / bpm * 4
+    beat_ms = measure_ms / 4
+    elapsed = np.mod(times_ms - LEAD_IN_BEATS * beat_ms, measure_ms)
+    dist = elapsed - (phrase_beats - 1) * beat_ms
+    dist = np.where(dist > measure_ms / 2, dist - measure_ms, dist)
+    dist = np.where(dist < -measure_ms / 2, dist + measure_ms, dist)
+    return np.searchsorted(_WINDOWS, np.abs(dist), side='left')
+
+
+def check_spawns(hit_ids, hit_times, visible_at_once):
+    """Reject hits on orbs that could not have been on screen yet."""
+    order = np.lexsort((hit_ids, hit_times))
+    ids, times = hit_ids[order], hit_times[order]
+    # The k-th hit (0-based) can only reach orbs 0 .. visible_at_once + k - 1
+    if np.any(ids >= visible_at_once + np.arange(len(ids))):
+        raise ReplayError('hits land on orbs that had not spawned yet')
+    opening = ids < visible_at_once
+    if np.any(times[opening] < ids[opening] * INITIAL_SPAWN_STAGGER_MS - SPAWN_TOLERANCE_MS):
+        raise ReplayError('hits land on orbs that had not spawned yet')
+
+
+def min_clear_ms(bpm, target_count):
+    beat_ms = 60000 / bpm
+    return (LEAD_IN_BEATS + MIN_CLEAR_BEATS_PER_TARGET * target_count) * beat_ms
+
+
+def tier_for(time_s, target_count):
+    # Mirrors getTier(): gold within 5 + n seconds, then +n per tier
+    for tier, per_target in (('gold', 1), ('silver', 2), ('bronze', 3)):
+        if time_s <= 5 + per_target * target_count:
+            return tier
+    return 'none'
+
+
+def verify_replay(level, replay):
+    """Judge `replay` against a generate_level() payload and return the verdict."""
+    bpm = BASS_STYLES[level['bassStyle']]['bpm']
+    orbs, targets = level['orbs'], level['targets']
+    hit_ids, hit_times = _events(replay.get('hits'), 'hits', len(orbs))
+    target_ids, target_times = _events(replay.get('targets', []), 'targets', len(targets))
+
+    if len(target_times):
+        gap = np.abs(target_times[:, None] - hit_times[None, :]).min(axis=1) if len(hit_times) else None
+        if gap is None or np.any(gap > TARGET_HIT_TOLERANCE_MS):
+            raise ReplayError('every destroyed target must coincide with a hit')
+
+    check_spawns(hit_ids, hit_times, level['visibleAtOnce'])
+
+    phrase_beats = np.array([orb['phraseBeat'] for orb in orbs], dtype=np.float64)[hit_ids]
+    ratings = judge_hits(phrase_beats, hit_times, bpm)
+    counts = np.bincount(ratings, minlength=len(RATINGS))
+
+    cleared = len(target_ids) == len(targets)
+    time_ms = float(target_times.max()) if cleared and len(target_times) else None
+    if time_ms is not None and time_ms < min_clear_ms(bpm, len(targets)):
+        raise ReplayError('clear is faster than the level allows')
+    return {
+        'level': level['level'], 'bassStyle': level['bassStyle'],
+        'cleared': cleared,
+        'timeMs': round(time_ms, 1) if time_ms is not None else None,
+        'tier': tier_for(time_ms / 1000, len(targets)) if time_ms is not None else 'none',
+        'points': int(_POINTS[ratings].sum()),
+        'ratings': {name: int(count) for name, count in zip(RATINGS, counts, strict=True)},
+        'targetsDestroyed': int(len(target_ids)),
+    }
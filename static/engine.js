@@ -1,6 +1,6 @@
 // ═══════════════════════════════════════════════════════════════
 //  engine.js — AURA stable rendering, audio & utility layer
-//  Globals referenced at call-time from index.html:
+//  Globals referenced at call-time from game.js:
 //    ctx, canvasW, canvasH, orbScale, state
 // ═══════════════════════════════════════════════════════════════
 
@@ -90,6 +90,66 @@ function getBrightness(orb, time) {
     return { brightness: 0.12 + 0.88 * gaussian, dist: distAbs };
 }
 
+// ═══════════════════════════════════════
+//  LEVEL WIRE FORMATS
+// ═══════════════════════════════════════
+// Compact level encodings (see level_format.py). Decoded orbs come back
+// ready for play — no per-orb spread in loadLevel.
+const LEVEL_ACCEPT = 'application/vnd.gemslap.level, application/vnd.gemslap.columns+json;q=0.9, application/json;q=0.5';
+const _LEVEL_FLOAT_COLS = ['x', 'y', 'size', 'driftX', 'driftY', 'phraseBeat'];
+const _LEVEL_ROUND = { x: 10, y: 10, size: 100, driftX: 1000, driftY: 1000, phraseBeat: 100 };
+
+function _orbsFromColumns(level, cols) {
+    const orbs = new Array(level.orbCount);
+    for (let i = 0; i < level.orbCount; i++) {
+        orbs[i] = {
+            id: i, x: cols.x[i], y: cols.y[i], size: cols.size[i],
+            driftX: cols.driftX[i], driftY: cols.driftY[i], phraseBeat: cols.phraseBeat[i],
+            note: cols.note[i], wave: cols.wave[i],
+            color: level.colors[cols.color[i]], phraseName: level.phraseNames[cols.phrase[i]],
+            hit: false, fade: 0, spawned: false,
+        };
+    }
+    return orbs;
+}
+
+function decodeLevelColumns(level) {
+    level.orbs = _orbsFromColumns(level, level.orbColumns);
+    return level;
+}
+
+// Columns are typed-array views straight onto the response buffer; float32
+// values are re-rounded to the precision the server sent
+function decodeLevelBinary(buffer) {
+    const view = new DataView(buffer);
+    if (view.getUint32(0) !== 0x47534C31) throw new Error('bad level magic');  // 'GSL1'
+    const metaLen = view.getUint32(4, true);
+    const level = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 8, metaLen)));
+    const n = level.orbCount;
+    let off = 8 + metaLen;
+    const cols = {};
+    for (const key of _LEVEL_FLOAT_COLS) { cols[key] = new Float32Array(buffer, off, n); off += n * 4; }
+    cols.wave = new Uint16Array(buffer, off, n); off += n * 2;
+    cols.note = new Int8Array(buffer, off, n); off += n;
+    cols.phrase = new Uint8Array(buffer, off, n); off += n;
+    cols.color = new Uint8Array(buffer, off, n);
+    level.columns = cols;
+    level.orbs = _orbsFromColumns(level, cols);
+    for (const orb of level.orbs) {
+        for (const key of _LEVEL_FLOAT_COLS) orb[key] = Math.round(orb[key] * _LEVEL_ROUND[key]) / _LEVEL_ROUND[key];
+    }
+    return level;
+}
+
+async function readLevelResponse(res) {
+    const type = res.headers.get('Content-Type') || '';
+    if (type.startsWith('application/vnd.gemslap.level')) return decodeLevelBinary(await res.arrayBuffer());
+    const data = await res.json();
+    if (data.format === 'columns') return decodeLevelColumns(data);
+    data.orbs = data.orbs.map(o => ({ ...o, hit: false, fade: 0, spawned: false }));
+    return data;
+}
+
 // ═══════════════════════════════════════
 //  PENTATONIC HARMONY SYSTEM
 // ═══════════════════════════════════════
@@ -0,0 +1,1223 @@
+// ═══════════════════════════════════════════════════════════════
+//  game.js — Progress, level flow, input, scoring & main loop
+//  Loaded after engine.js and before menu.js (see templates/index.html)
+// ═══════════════════════════════════════════════════════════════
+
+// ═══════════════════════════════════════
+//  PROGRESS — localStorage save/restore
+// ═══════════════════════════════════════
+const TOTAL_LEVELS = 50;
+const SAVE_KEY = 'gs_progress';
+
+function loadProgress() {
+    try {
+        const raw = localStorage.getItem(SAVE_KEY);
+        return raw ? JSON.parse(raw) : {};
+    } catch { return {}; }
+}
+
+function saveProgress(patch) {
+    try {
+        const current = loadProgress();
+        const next = Object.assign(current, patch);
+        localStorage.setItem(SAVE_KEY, JSON.stringify(next));
+    } catch { }
+}
+
+function getBestTime(level) {
+    const p = loadProgress();
+    return (p.bestTimes && p.bestTimes[level] != null) ? p.bestTimes[level] : null;
+}
+
+function setBestTime(level, time) {
+    const p = loadProgress();
+    const bestTimes = p.bestTimes || {};
+    const bestTiers = p.bestTiers || {};
+    const { tier } = getTier(time, state.targetTime);
+    const isNew = bestTimes[level] == null || time < bestTimes[level];
+    if (isNew) {
+        bestTimes[level] = time;
+        bestTiers[level] = tier;
+        saveProgress({ bestTimes, bestTiers, highestLevel: Math.min(TOTAL_LEVELS, Math.max(p.highestLevel || 1, level)) });
+    }
+    return isNew;
+}
+
+// ═══════════════════════════════════════
+//  ANALYTICS & AD TRACKING
+// ═══════════════════════════════════════
+function trackOnce(key, gaName, gaParams, metaEvent, metaParams) {
+    const p = loadProgress();
+    const fired = p.firedPixels || {};
+    if (fired[key]) return false;
+    fired[key] = true;
+    saveProgress({ firedPixels: fired });
+    try { gtag('event', gaName, gaParams || {}); } catch(e) {}
+    if (metaEvent) { try { fbq('track', metaEvent, metaParams || {}); } catch(e) {} }
+    return true;
+}
+
+// ═══════════════════════════════════════
+//  DOM & CANVAS SETUP
+// ═══════════════════════════════════════
+const $ = id => document.getElementById(id);
+const canvas = $('canvas');
+const ctx = canvas.getContext('2d');
+let gameWrap, canvasW = 400, canvasH = 600;
+
+const audio = new Audio();
+
+// ═══════════════════════════════════════
+//  GAME STATE
+// ═══════════════════════════════════════
+const state = {
+    level: 1, orbs: [], allOrbs: [], bpm: 90, speed: 0.2, targetTime: 7, silverTime: null, bronzeTime: null,
+    timing: { perfect: 100, great: 200, good: 350 },
+    points: { perfect: 100, great: 60, good: 30, miss: 10 },
+    score: 0, melody: [],
+    startTime: 0, elapsed: 0, beatTime: 0, measureMs: 2000,
+    started: false, playing: false, complete: false, levelCleared: false,
+    countdown: 0, countdownStart: 0,
+    visibleAtOnce: 4, totalOrbs: 12, orbsHit: 0, orbsSpawned: 0,
+    bassStyle: 0, favBassStyle: null,
+    targets: [], totalTargets: 0, targetsDestroyed: 0, replay: { hits: [], targets: [] }, pendingReplay: null,
+    targetDestroyRadius: 22, patternName: '',
+    batchName: '', levelInSet: 1,
+    freePlay: false, freePlayData: null,
+    _reveal: null,
+};
+
+// ═══════════════════════════════════════
+//  PARTICLES & EFFECTS
+// ═══════════════════════════════════════
+let motes = [], bursts = [], crystalShards = [], energyMotes = [], crystalDust = [];
+
+const SHOCK_RADIUS = 38;
+const SHOCK_STRENGTH = 10.0;
+const SHOCK_DECAY = 0.965;
+const SHOCK_MIN = 0.015;
+let shockwaves = [];
+let screenShake = { x: 0, y: 0, intensity: 0 };
+
+function initMotes() { motes = []; for (let i = 0; i < 35; i++) motes.push(new Mote(canvasW, canvasH)); }
+
+// ═══════════════════════════════════════
+//  RESPONSIVE LAYOUT
+// ═══════════════════════════════════════
+let orbScale = 1;
+
+function resize() {
+    gameWrap = document.querySelector('.game-wrap'); if (!gameWrap) return;
+    const wrapRect = gameWrap.getBoundingClientRect(), wrapW = wrapRect.width, wrapH = wrapRect.height;
+    const safeTop = window.innerHeight !== document.documentElement.clientHeight ? Math.min(50, window.innerHeight - document.documentElement.clientHeight) : 0;
+    const _safeProbe = document.createElement('div');
+    _safeProbe.style.cssText = 'position:fixed;bottom:0;height:0;padding-bottom:env(safe-area-inset-bottom,0px);visibility:hidden;pointer-events:none;';
+    document.body.appendChild(_safeProbe);
+    const safeBottom = parseFloat(getComputedStyle(_safeProbe).paddingBottom) || 0;
+    document.body.removeChild(_safeProbe);
+    const headerH = 52 + safeTop, progH = 2, footerH = 36 + safeBottom, canvasTop = headerH + progH;
+    canvasW = Math.max(100, Math.floor(wrapW)); canvasH = Math.max(100, Math.floor(wrapH - canvasTop - footerH));
+    canvas.style.top = canvasTop + 'px'; canvas.style.left = '0'; canvas.style.width = canvasW + 'px'; canvas.style.height = canvasH + 'px';
+    const dpr = Math.min(window.devicePixelRatio || 1, 2);
+    canvas.width = canvasW * dpr; canvas.height = canvasH * dpr; ctx.setTransform(1, 0, 0, 1, 0, 0); ctx.scale(dpr, dpr);
+    orbScale = Math.min(1, Math.min(canvasW, canvasH) / 350);
+    if (typeof _bgW !== 'undefined') { _bgW = 0; }
+    if (typeof _orbPathCache !== 'undefined') _orbPathCache.clear();
+    initMotes();
+}
+window.addEventListener('resize', () => setTimeout(resize, 50));
+window.addEventListener('orientationchange', () => setTimeout(resize, 200));
+if (window.visualViewport) window.visualViewport.addEventListener('resize', () => setTimeout(resize, 50));
+
+function getOrbAt(x, y) {
+    for (let i = state.orbs.length - 1; i >= 0; i--) {
+        const orb = state.orbs[i]; if (orb.hit) continue;
+        const p = toScreen(orb), r = 32 * orb.size * orbScale;
+        if (Math.hypot(x - p.x, y - p.y) < r * 1.1) return orb;
+    }
+    return null;
+}
+
+function getRating(orb, time) {
+    const { dist } = getBrightness(orb, time);
+    if (dist <= state.timing.perfect) return 'perfect';
+    if (dist <= state.timing.great) return 'great';
+    if (dist <= state.timing.good) return 'good';
+    return 'miss';
+}
+
+// ═══════════════════════════════════════
+//  LEVEL CELEBRATION — "Confetti Burst"
+// ═══════════════════════════════════════
+const _CB_PALETTE = [
+    '#FF2840','#FF6B35','#F5C800','#28C858',
+    '#18C8E0','#A855F7','#EC4899','#FB923C',
+    '#8EEAF4','#B3C6FF','#D4A7FF','#FDE68A',
+    '#6EE7B7','#FDA4AF','#A5F3FC','#FFD700',
+    '#FFFFFF','#FFF0F5','#FFFDE7','#F0FFF4',
+];
+
+function startShapeReveal() {
+    const GUN = { x: canvasW * 0.50, y: canvasH };
+    const WAVES = [
+        { count: 320, delayBase: 0.00, delayJitter: 0.08, speedMin: 380, speedMax: 680 },
+        { count: 260, delayBase: 0.20, delayJitter: 0.10, speedMin: 320, speedMax: 580 },
+        { count: 220, delayBase: 0.48, delayJitter: 0.14, speedMin: 260, speedMax: 500 },
+    ];
+    const G = 300;
+    const particles = [];
+    WAVES.forEach(wave => {
+        for (let i = 0; i < wave.count; i++) {
+            const angle = -Math.PI * 0.5 + (Math.random() - 0.5) * Math.PI * 1.78;
+            const speed = wave.speedMin + Math.random() * (wave.speedMax - wave.speedMin);
+            const roll = Math.random();
+            let pw, ph, isCircle = false;
+            if (roll < 0.52) { pw = 7 + Math.random() * 7; ph = 4 + Math.random() * 5; }
+            else if (roll < 0.75) { pw = 2.5 + Math.random() * 2; ph = 10 + Math.random() * 10; }
+            else { pw = 4 + Math.random() * 4; ph = pw; isCircle = true; }
+            particles.push({
+                x0: GUN.x + (Math.random() - 0.5) * canvasW * 0.60,
+                y0: GUN.y,
+                vx: Math.cos(angle) * speed,
+                vy: Math.sin(angle) * speed,
+                g:  G * (0.8 + Math.random() * 0.4),
+                ax: (Math.random() - 0.5) * 30,
+                flutterAmp:  12 + Math.random() * 16,
+                flutterFreq: (2.0 + Math.random() * 3.0) * Math.PI * 2,
+                flutterPh:   Math.random() * Math.PI * 2,
+                flipFreq: (1.5 + Math.random() * 3.5) * Math.PI * 2,
+                flipPh:   Math.random() * Math.PI * 2,
+                rot0:  Math.random() * Math.PI * 2,
+                drot:  (Math.random() - 0.5) * 12,
+                pw, ph, isCircle,
+                col:   _CB_PALETTE[Math.floor(Math.random() * _CB_PALETTE.length)],
+                delay: wave.delayBase + Math.random() * wave.delayJitter,
+            });
+        }
+    });
+
+    const centX  = state.targets.length
+        ? state.targets.reduce((s, t) => s + (t.x / 100) * canvasW, 0) / state.targets.length
+        : canvasW * 0.5;
+    const bottom = state.targets.length
+        ? Math.max(...state.targets.map(t => (t.y / 100) * canvasH))
+        : canvasH * 0.65;
+    const labelY = Math.min(canvasH - 52, bottom + 48);
+
+    state._reveal = {
+        active:    true,
+        startTime: performance.now(),
+        particles,
+        centX,
+        labelY,
+        name:  state.patternName || '',
+        batch: state.batchName ? `${state.batchName} · Level ${state.levelInSet}` : '',
+    };
+}
+
+// ═══════════════════════════════════════
+//  MAIN RENDER LOOP
+// ═══════════════════════════════════════
+function draw() {
+    state._lastDrawTime = performance.now();
+    state._lastDrawWall = Date.now();
+    const w = canvasW, h = canvasH, now = performance.now();
+
+    ctx.save();
+    if (screenShake.intensity > 0.1) {
+        screenShake.x = (Math.random() - 0.5) * screenShake.intensity;
+        screenShake.y = (Math.random() - 0.5) * screenShake.intensity;
+        screenShake.intensity *= 0.88;
+        ctx.translate(screenShake.x, screenShake.y);
+    } else { screenShake.intensity = 0; }
+
+    if (!_bgCanvas || _bgW !== w || _bgH !== h) _buildBgCanvas(w, h);
+    ctx.drawImage(_bgCanvas, -5, -5, w + 10, h + 10);
+
+    if (state.playing && !state.complete) {
+        if (!state.freePlay) state.elapsed = (now - state.startTime) / 1000;
+        if (now % 100 < 20) updateHUD();
+    }
+
+    if (motes.length === 0 && w > 0) initMotes();
+    motes.forEach(m => { m.w = w; m.h = h; m.update(); m.draw(ctx); });
+
+    if (!state.started || state.complete) {
+        const T = now / 1000;
+        const demoCrystals = [
+            { x: 30 + Math.sin(T * 0.2) * 5, y: 35 + Math.cos(T * 0.15) * 3, id: 0 },
+            { x: 70 + Math.cos(T * 0.18) * 4, y: 55 + Math.sin(T * 0.22) * 4, id: 1 },
+            { x: 50 + Math.sin(T * 0.25 + 2) * 6, y: 75 + Math.cos(T * 0.2 + 1) * 3, id: 2 },
+        ];
+        if (!state.started) {
+            demoCrystals.forEach(dc => drawCrystal({ ...dc, alive: true, destroyTime: null }, now));
+        }
+    }
+
+    state.targets.forEach(t => drawCrystal(t, now));
+
+    for (let i = bursts.length-1; i >= 0; i--)       { if (bursts[i].life <= 0)       bursts.splice(i,1); }
+    bursts.forEach(b => { b.update(); b.draw(ctx); });
+    for (let i = crystalShards.length-1; i >= 0; i--) { if (crystalShards[i].life <= 0) crystalShards.splice(i,1); }
+    crystalShards.forEach(s => { s.update(); s.draw(ctx); });
+    for (let i = energyMotes.length-1; i >= 0; i--)  { if (energyMotes[i].life <= 0)  energyMotes.splice(i,1); }
+    energyMotes.forEach(e => { e.update(); e.draw(ctx); });
+    for (let i = crystalDust.length-1; i >= 0; i--)  { if (crystalDust[i].life <= 0)  crystalDust.splice(i,1); }
+    crystalDust.forEach(d => { d.update(); d.draw(ctx); });
+
+    shockwaves = shockwaves.filter(sw => (now - sw.time) < 750);
+    shockwaves.forEach(sw => {
+        const age = now - sw.time, progress = age / 750;
+        const ease = 1 - Math.pow(1 - progress, 3);
+        const alpha = Math.pow(1 - progress, 1.5);
+        const cx = (sw.x / 100) * canvasW, cy = (sw.y / 100) * canvasH;
+        const avgDim = (canvasW + canvasH) / 2;
+        const r = (sw.effectiveRadius / 100) * avgDim * ease;
+        const srgb = hexToRgb(sw.color);
+        if (r > 2) {
+            ctx.beginPath(); ctx.arc(cx, cy, r, 0, Math.PI * 2);
+            ctx.strokeStyle = rgba(srgb.r, srgb.g, srgb.b, alpha * 0.08);
+            ctx.lineWidth = 14 * (1 - progress); ctx.stroke();
+            ctx.beginPath(); ctx.arc(cx, cy, r, 0, Math.PI * 2);
+            ctx.strokeStyle = `rgba(255,255,255,${alpha * 0.45 * (0.5 + sw.strength * 0.5)})`;
+            ctx.lineWidth = 2.5 * (1 - progress * 0.5); ctx.stroke();
+            ctx.beginPath(); ctx.arc(cx, cy, r * 0.9, 0, Math.PI * 2);
+            ctx.strokeStyle = rgba(srgb.r, srgb.g, srgb.b, alpha * 0.3 * (0.5 + sw.strength * 0.5));
+            ctx.lineWidth = 1.8 * (1 - progress * 0.5); ctx.stroke();
+        }
+        if (progress < 0.3) {
+            const fillA = (1 - progress / 0.3) * 0.07 * (0.5 + sw.strength);
+            const fillGrad = ctx.createRadialGradient(cx, cy, 0, cx, cy, r);
+            fillGrad.addColorStop(0, `rgba(255,255,255,${fillA * 0.6})`);
+            fillGrad.addColorStop(0.5, rgba(srgb.r, srgb.g, srgb.b, fillA * 0.25));
+            fillGrad.addColorStop(1, rgba(srgb.r, srgb.g, srgb.b, 0));
+            ctx.fillStyle = fillGrad; ctx.beginPath(); ctx.arc(cx, cy, r, 0, Math.PI * 2); ctx.fill();
+        }
+    });
+
+    const orbsToDraw = [...state.orbs].sort((a, b) => a.y - b.y);
+    orbsToDraw.forEach(orb => {
+        try {
+            if (orb.hit) {
+                if (orb.fade > 0.01) {
+                    orb.fade -= 0.05;
+                    const p = toScreen(orb), rgb = hexToRgb(orb.color), r = 32 * orb.size * orbScale;
+                    const ring1R = r * (1 + (1 - orb.fade) * 1.2), ring2R = r * (1 + (1 - orb.fade) * 0.8);
+                    ctx.beginPath(); ctx.arc(p.x, p.y, ring1R, 0, Math.PI * 2); ctx.strokeStyle = rgba(rgb.r, rgb.g, rgb.b, orb.fade * 0.4); ctx.lineWidth = 2; ctx.stroke();
+                    ctx.beginPath(); ctx.arc(p.x, p.y, ring2R, 0, Math.PI * 2); ctx.strokeStyle = rgba(255, 255, 255, orb.fade * 0.3); ctx.lineWidth = 1.5; ctx.stroke();
+                    if (orb.fade > 0.1) {
+                        const fadeR = Math.max(1, r * orb.fade);
+                        const fadeGrad = ctx.createRadialGradient(p.x, p.y, 0, p.x, p.y, fadeR);
+                        fadeGrad.addColorStop(0, rgba(255, 255, 255, orb.fade * 0.4)); fadeGrad.addColorStop(0.5, rgba(rgb.r, rgb.g, rgb.b, orb.fade * 0.2)); fadeGrad.addColorStop(1, rgba(rgb.r, rgb.g, rgb.b, 0));
+                        ctx.beginPath(); ctx.arc(p.x, p.y, fadeR, 0, Math.PI * 2); ctx.fillStyle = fadeGrad; ctx.fill();
+                    }
+                }
+                return;
+            }
+
+            const driftMult = 0.25;
+            orb.x += orb.driftX * driftMult;
+            orb.y += orb.driftY * driftMult;
+            if (orb.shockVx || orb.shockVy) {
+                orb.x += orb.shockVx; orb.y += orb.shockVy;
+                const transferRate = 0.04;
+                orb.driftX += (orb.shockVx / driftMult) * transferRate;
+                orb.driftY += (orb.shockVy / driftMult) * transferRate;
+                if (!orb._baseDriftSpeed) orb._baseDriftSpeed = Math.hypot(orb.driftX, orb.driftY);
+                const maxDrift = orb._baseDriftSpeed * 2.5;
+                const curDrift = Math.hypot(orb.driftX, orb.driftY);
+                if (curDrift > maxDrift) { orb.driftX = (orb.driftX / curDrift) * maxDrift; orb.driftY = (orb.driftY / curDrift) * maxDrift; }
+                orb.shockVx *= SHOCK_DECAY; orb.shockVy *= SHOCK_DECAY;
+                orb.shockEnergy = Math.hypot(orb.shockVx, orb.shockVy);
+                if (orb.shockEnergy < SHOCK_MIN) { orb.shockVx = 0; orb.shockVy = 0; orb.shockEnergy = 0; }
+            }
+            if (orb.x < 15 || orb.x > 85) { orb.driftX *= -1; if (orb.shockVx) orb.shockVx *= -0.5; orb.x = Math.max(15, Math.min(85, orb.x)); }
+            if (orb.y < 15 || orb.y > 85) { orb.driftY *= -1; if (orb.shockVy) orb.shockVy *= -0.5; orb.y = Math.max(15, Math.min(85, orb.y)); }
+
+            drawOrb(orb, now);
+        } catch (e) { console.error('Orb draw error:', e); }
+    });
+
+    const rev = state._reveal;
+    if (rev && rev.active) {
+        const revT = (performance.now() - rev.startTime) / 1000;
+        rev.particles.forEach(p => {
+            const pt = revT - p.delay;
+            if (pt <= 0) return;
+            const bx = p.x0 + p.vx * pt + 0.5 * p.ax * pt * pt;
+            const by = p.y0 + p.vy * pt + 0.5 * p.g  * pt * pt;
+            const flutter = p.flutterAmp * Math.sin(p.flutterFreq * pt + p.flutterPh);
+            const spd = Math.hypot(p.vx, p.vy + p.g * pt) || 1;
+            const nx  = -(p.vy + p.g * pt) / spd;
+            const ny  =   p.vx / spd;
+            const x   = bx + flutter * nx;
+            const y   = by + flutter * ny;
+            if (y > canvasH + 40) return;
+            if (x < -80 || x > canvasW + 80) return;
+            const fadeIn  = Math.min(1, pt / 0.15);
+            const landA   = y > canvasH * 0.70
+                ? Math.max(0, 1 - (y - canvasH * 0.70) / (canvasH * 0.35))
+                : 1;
+            const a = fadeIn * landA * 0.95;
+            if (a < 0.018) return;
+            const rot = p.rot0 + p.drot * pt;
+            const flipW = p.isCircle
+                ? p.pw
+                : p.pw * Math.max(0.12, Math.abs(Math.cos(p.flipFreq * pt + p.flipPh)));
+            const rgb = hexToRgb(p.col);
+            ctx.save();
+            ctx.globalAlpha = a;
+            ctx.translate(x, y);
+            ctx.rotate(rot);
+            ctx.fillStyle = `rgb(${rgb.r},${rgb.g},${rgb.b})`;
+            if (p.isCircle) {
+                ctx.beginPath();
+                ctx.arc(0, 0, p.pw * 0.5, 0, Math.PI * 2);
+                ctx.fill();
+            } else {
+                ctx.fillRect(-flipW * 0.5, -p.ph * 0.5, flipW, p.ph);
+            }
+            ctx.restore();
+        });
+    }
+
+    ctx.restore();
+    state.rafId = requestAnimationFrame(draw);
+}
+
+// ═══════════════════════════════════════
+//  SCORING
+// ═══════════════════════════════════════
+function calcScore() {
+    const time = state.elapsed;
+    const target = state.targetTime;
+    return { time, target };
+}
+function getTier(time, target) {
+    const silver = state.silverTime != null ? state.silverTime : target * 1.5;
+    const bronze = state.bronzeTime != null ? state.bronzeTime : target * 2.0;
+    if (time <= target) return { tier: 'gold',   text: '🥇' };
+    if (time <= silver) return { tier: 'silver', text: '🥈' };
+    if (time <= bronze) return { tier: 'bronze', text: '🥉' };
+    return { tier: 'none', text: '—' };
+}
+
+function levelLabel(style = 'text') {
+    const name = state.patternName || '';
+    const num  = state.level || 1;
+    if (style === 'header') return name || `Level ${num}`;
+    if (style === 'end') return name ? `Level ${num}: ${name}` : `Level ${num}`;
+    return name ? `Level ${num}: ${name}` : `Level ${num}`;
+}
+
+function updateHUD() {
+    const { time, target } = calcScore();
+    const { tier } = getTier(time, target);
+    $('h-time').textContent = `${time.toFixed(1)}s`;
+    $('h-time').style.color = tier === 'gold' ? '#F9DB6D' : tier === 'silver' ? '#4ECDC4' : tier === 'bronze' ? '#7EC8F0' : 'rgba(210,70,70,0.85)';
+    const orbsLeft = state.totalOrbs - state.orbsHit;
+    const crystalsLeft = state.totalTargets - state.targetsDestroyed;
+    const orbEl = $('h-orbs');
+    orbEl.textContent = orbsLeft;
+    orbEl.className = '';
+    if (crystalsLeft > 0) {
+        if (orbsLeft <= crystalsLeft) orbEl.className = 'orbs-critical';
+        else if (orbsLeft <= crystalsLeft + 2) orbEl.className = 'orbs-low';
+    }
+    $('prog-fill').style.width = `${Math.min(100, (state.targetsDestroyed / state.totalTargets) * 100)}%`;
+}
+
+function buildCrystalDots() { }
+
+// ═══════════════════════════════════════
+//  INTERACTION — HIT ORB + CRYSTAL CHECK
+// ═══════════════════════════════════════
+function hitOrb(orb, x, y) {
+    if (!orb || orb.hit || state.complete) return;
+    const now = performance.now();
+    const rating = getRating(orb, now);
+    const pts = state.points[rating] || 10;
+
+    orb.hit = true; orb.fade = 1; orb.hitTime = now;
+    state.orbsHit++;
+    if (!state.freePlay) state.replay.hits.push([orb.id, replayMs(now)]);
+    state.melody.push({ note: orb.note, color: orb.color, rating });
+    const _op = loadProgress();
+    saveProgress({ totalOrbsHit: (_op.totalOrbsHit||0) + 1 });
+
+    const vol = rating === 'perfect' ? 0.25 : rating === 'great' ? 0.21 : rating === 'good' ? 0.17 : 0.15;
+    audio.tone(orb.note, 0.95, vol);
+
+    const { brightness: hitBrightness } = getBrightness(orb, now);
+    const hitSpawnAge = orb.spawnTime ? (now - orb.spawnTime) : 1000;
+    const hitSpawnFade = Math.min(1, hitSpawnAge / 600);
+    const hitSpawnEase = hitSpawnFade < 0.5 ? 4*hitSpawnFade*hitSpawnFade*hitSpawnFade : 1 - Math.pow(-2*hitSpawnFade+2,3)/2;
+    const hitB = hitBrightness * hitSpawnEase;
+    const hitSizeScale = 0.32 + hitB * 0.68;
+    const orbVisualR = 40 * (orb.size || 1) * orbScale * hitSizeScale * hitSpawnEase;
+    const crystalVisualR = 18 * orbScale * 1.1;
+    const orbScreenX = (orb.x / 100) * canvasW;
+    const orbScreenY = (orb.y / 100) * canvasH;
+
+    let orbsAffected = 0, maxForce = 0;
+    state.orbs.forEach(other => {
+        if (other === orb || other.hit) return;
+        const dx = other.x - orb.x, dy = other.y - orb.y;
+        const dist = Math.hypot(dx, dy);
+        if (dist < SHOCK_RADIUS && dist > 0.5) {
+            const normalDist = dist / SHOCK_RADIUS;
+            const force = SHOCK_STRENGTH * Math.pow(1 - normalDist, 2);
+            const angle = Math.atan2(dy, dx);
+            other.shockVx = (other.shockVx || 0) + Math.cos(angle) * force;
+            other.shockVy = (other.shockVy || 0) + Math.sin(angle) * force;
+            other.shockEnergy = Math.hypot(other.shockVx, other.shockVy);
+            other.shockFlash = now;
+            orbsAffected++; maxForce = Math.max(maxForce, force);
+        }
+    });
+
+    const scatterStrength = Math.min(1, orbsAffected / 4);
+    if (orbsAffected > 0) {
+        shockwaves.push({ x: orb.x, y: orb.y, time: now, strength: scatterStrength, color: orb.color, effectiveRadius: SHOCK_RADIUS });
+        screenShake.intensity = Math.max(screenShake.intensity, Math.min(8, orbsAffected * 1.8 + maxForce * 2));
+        audio.shockwaveSound(scatterStrength);
+    }
+
+    let crystalsHitThisTurn = 0;
+    state.targets.forEach(target => {
+        if (!target.alive) return;
+        const crystalScreenX = (target.x / 100) * canvasW;
+        const crystalScreenY = (target.y / 100) * canvasH;
+        const distPx = Math.hypot(crystalScreenX - orbScreenX, crystalScreenY - orbScreenY);
+        if (distPx <= orbVisualR + crystalVisualR) {
+            target.alive = false; target.destroyTime = now;
+            state.targetsDestroyed++; crystalsHitThisTurn++;
+            if (!state.freePlay) state.replay.targets.push([target.id, replayMs(now)]);
+            const palette = CRYSTAL_PALETTE[target.id % CRYSTAL_PALETTE.length];
+            const sx = (target.x / 100) * canvasW, sy = (target.y / 100) * canvasH;
+            const shardR = 18 * orbScale;
+            const _pm = (typeof _isMobile !== 'undefined' && _isMobile);
+            for (let i = 0; i < (_pm ? 6 : 10) + Math.floor(Math.random() * (_pm ? 4 : 6)); i++) crystalShards.push(new CrystalShard(sx, sy, palette, shardR));
+            for (let i = 0; i < (_pm ? 8 : 15) + Math.floor(Math.random() * (_pm ? 6 : 10)); i++) energyMotes.push(new EnergyMote(sx, sy));
+            for (let i = 0; i < (_pm ? 6 : 12) + Math.floor(Math.random() * (_pm ? 4 : 8)); i++) crystalDust.push(new CrystalDustP(sx, sy, palette));
+            audio.crystalShatter(state.targetsDestroyed - 1, state.totalTargets);
+        }
+    });
+
+    const avgDim = (canvasW + canvasH) / 2;
+    const overlapRadiusPercent = ((orbVisualR + crystalVisualR) / avgDim) * 100;
+    if (crystalsHitThisTurn > 0) {
+        shockwaves.push({ x: orb.x, y: orb.y, time: now, strength: Math.min(1, crystalsHitThisTurn / 3), color: CRYSTAL_PALETTE[0].mid, effectiveRadius: overlapRadiusPercent });
+        screenShake.intensity = Math.max(screenShake.intensity, crystalsHitThisTurn * 5);
+        if (crystalsHitThisTurn >= 2) {
+            showPop(x, y - 28, 'crystal-break', false, `×${crystalsHitThisTurn} SHATTER`);
+            state._chainReactionEarned = true;
+        }
+    }
+
+    const p = toScreen(orb);
+    const baseCount = rating === 'perfect' ? 18 : rating === 'great' ? 10 : rating === 'good' ? 5 : 2;
+    const scatterBonus = Math.min(14, orbsAffected * 3);
+    for (let i = 0; i < baseCount + scatterBonus; i++) {
+        const b = new Burst(p.x, p.y, orb.color);
+        if (i >= baseCount) { b.size *= 1.3; const a = (i / scatterBonus) * Math.PI * 2; b.vx = Math.cos(a) * (3 + Math.random() * 2); b.vy = Math.sin(a) * (3 + Math.random() * 2); }
+        bursts.push(b);
+    }
+
+    updateHUD();
+
+    if (state.targetsDestroyed >= state.totalTargets && !state.freePlay) {
+        state.levelCleared = true;
+        state.freePlay = true;
+        state.freePlayData = { ...calcScore() };
+        if (state.orbsHit >= state.totalOrbs) state._lastCrystalUsed = true;
+        if (state.elapsed <= 8) state._wreckingBallEarned = true;
+        if ((state.totalOrbs - state.orbsHit) >= 4) state._orbsSpareEarned = true;
+        showPop(canvasW / 2, canvasH / 2 + 52, 'crystal-clear', false, 'ALL SHATTERED');
+        submitReplay();
+        setTimeout(() => audio.crystalsClear(), 30);
+        updateHUD();
+        setTimeout(() => startShapeReveal(), 620);
+        setTimeout(() => showFloatingEnd(), 1000);
+        trySpawnNext();
+        return;
+    }
+    if (!state.freePlay && state.orbsHit >= state.totalOrbs) {
+        state.levelCleared = false;
+        setTimeout(() => endLevel(false), 600);
+        return;
+    }
+    trySpawnNext();
+}
+
+// Server re-judges the run from these before it reaches the leaderboard
+function replayMs(now) { return Math.round((now - state.startTime) * 10) / 10; }
+
+// Held until the player leaves the end card, so the name typed there goes
+// with it; flushed on the next loadLevel() or when the page is hidden
+function submitReplay() {
+    state.pendingReplay = {
+        level: state.level, bass: state.bassStyle,
+        hits: state.replay.hits, targets: state.replay.targets,
+    };
+}
+
+function flushReplay() {
+    if (!state.pendingReplay) return;
+    const body = JSON.stringify({ ...state.pendingReplay, name: loadProgress().playerName || '' });
+    state.pendingReplay = null;
+    fetch('/api/replay', { method: 'POST', headers: { 'Content-Type': 'application/json' }, body, keepalive: true })
+        .catch(() => {});
+}
+window.addEventListener('pagehide', flushReplay);
+
+// Leaderboard name, edited on the end card; blank posts as "anonymous"
+const PLAYER_NAME_MAX = 24;
+function savePlayerName(value) {
+    saveProgress({ playerName: value.trim().slice(0, PLAYER_NAME_MAX) });
+}
+
+function showPop(x, y, rating, isScatter = false, customText = null) {
+    const el = document.createElement('div');
+    el.className = `pop ${rating}${isScatter ? ' scatter' : ''}`;
+    el.textContent = customText || rating;
+    el.style.left = x + 'px'; el.style.top = (y + 52) + 'px';
+    document.querySelector('.game-wrap').appendChild(el);
+    setTimeout(() => el.remove(), rating === 'crystal-clear' ? 800 : isScatter ? 500 : 450);
+}
+
+function handleInput(e) {
+    e.preventDefault(); audio.unlock();
+    if (!state.started) { startGame(); return; }
+    if (state.complete || !state.playing) return;
+    const rect = canvas.getBoundingClientRect();
+    const touches = e.touches || [{ clientX: e.clientX, clientY: e.clientY }];
+    for (const t of touches) {
+        const x = t.clientX - rect.left, y = t.clientY - rect.top;
+        const orb = getOrbAt(x, y);
+        if (orb) hitOrb(orb, x, y);
+    }
+}
+canvas.addEventListener('touchstart', handleInput, { passive: false });
+canvas.addEventListener('mousedown', handleInput);
+$('start-screen').addEventListener('click', () => { audio.unlock(); if (!state.started) startGame(); });
+$('play-btn').addEventListener('click', (e) => { e.stopPropagation(); audio.unlock(); if (!state.started) startGame(); });
+
+document.querySelectorAll('.legal-link').forEach(link => {
+    link.addEventListener('click', e => e.stopPropagation());
+    link.addEventListener('touchstart', e => e.stopPropagation(), { passive: true });
+});
+
+// ═══════════════════════════════════════
+//  INTRO SCENE ANIMATION
+// ═══════════════════════════════════════
+const introState = { running: true };
+
+function introLoop() {
+    if (!introState.running) return;
+    const now = performance.now();
+    const ic = $('intro-canvas');
+    const rect = ic.getBoundingClientRect();
+    ic.width  = rect.width  * (window.devicePixelRatio || 1);
+    ic.height = rect.height * (window.devicePixelRatio || 1);
+    const ictx = ic.getContext('2d');
+    ictx.scale((window.devicePixelRatio || 1), (window.devicePixelRatio || 1));
+    const W = rect.width, H = rect.height;
+    const T = now / 1000;
+
+    ictx.fillStyle = '#030308'; ictx.fillRect(0, 0, W, H);
+
+    const depthG = ictx.createRadialGradient(W*0.5, H*0.48, 0, W*0.5, H*0.48, Math.max(W,H)*0.72);
+    depthG.addColorStop(0,   'rgba(80,40,120,0.08)');
+    depthG.addColorStop(0.5, 'rgba(40,20,80,0.04)');
+    depthG.addColorStop(1,   'rgba(0,0,0,0)');
+    ictx.fillStyle = depthG; ictx.fillRect(0, 0, W, H);
+
+    const spkCols = [[127,244,240],[148,170,255],[192,132,252],[244,114,182],[255,209,82],[130,255,170],[255,160,120],[168,247,200],[220,130,255],[255,200,140],[100,220,255]];
+    for (let i = 0; i < 11; i++) {
+        const seed = i * 2.618;
+        const bx = ((Math.sin(seed * 1.3) * 0.5 + 0.5) * 0.85 + 0.075) * W;
+        const by = ((Math.cos(seed * 2.1) * 0.5 + 0.5) * 0.8  + 0.1)   * H;
+        const py = ((by - T * (7 + (i % 4) * 2.5)) % H + H) % H;
+        const px = bx + Math.sin(T * 0.4 + seed) * 7;
+        const pa = (Math.sin(T * 0.55 + seed * 2.5) * 0.5 + 0.5) * 0.2;
+        const ps = 1.4 + (i % 4) * 1.1;
+        const [cr,cg,cb] = spkCols[i % spkCols.length];
+        ictx.save(); ictx.translate(px, py); ictx.rotate(T * 0.22 + seed * 0.5);
+        ictx.beginPath();
+        ictx.moveTo(0, -ps*1.35); ictx.lineTo(ps*0.62, 0);
+        ictx.lineTo(0,  ps*1.0 ); ictx.lineTo(-ps*0.62, 0);
+        ictx.closePath();
+        ictx.fillStyle = `rgba(${cr},${cg},${cb},${pa})`; ictx.fill();
+        ictx.restore();
+    }
+
+    const cycle    = 4600;
+    const t        = (now % cycle) / cycle;
+    const sceneY   = H * 0.44;
+    const crystalX = W * 0.64;
+    const orbStartX = W * 0.1;
+    const orbEndX   = crystalX - 6;
+    const orbPhase  = Math.min(1, t / 0.48);
+    const orbX      = orbStartX + (orbEndX - orbStartX) * easeInOutCubic(orbPhase);
+    const orbAlpha  = t < 0.04 ? t / 0.04 : (t > 0.52 ? Math.max(0, 1 - (t - 0.52) / 0.08) : 1);
+    const crystalAlive = t < 0.50;
+    const shockPhase   = t > 0.50 ? (t - 0.50) / 0.22 : -1;
+
+    if (crystalAlive) {
+        const cR = Math.min(W, H) * 0.052;
+        const R  = cR * (1 + Math.sin(T * 1.4) * 0.04);
+        const glow = ictx.createRadialGradient(crystalX, sceneY, R*0.4, crystalX, sceneY, R*4.2);
+        glow.addColorStop(0,   'rgba(212,167,255,0.16)');
+        glow.addColorStop(0.35,'rgba(168,247,244,0.07)');
+        glow.addColorStop(1,   'rgba(0,0,0,0)');
+        ictx.fillStyle = glow; ictx.beginPath(); ictx.arc(crystalX, sceneY, R*4.2, 0, Math.PI*2); ictx.fill();
+
+        const top    = { x: crystalX,          y: sceneY - R*1.3  };
+        const right  = { x: crystalX + R*0.9,  y: sceneY - R*0.05 };
+        const bottom = { x: crystalX,           y: sceneY + R*1.0  };
+        const left   = { x: crystalX - R*0.9,  y: sceneY - R*0.05 };
+        const crL    = { x: crystalX - R*0.33,  y: sceneY - R*0.55 };
+        const crR    = { x: crystalX + R*0.33,  y: sceneY - R*0.55 };
+
+        ictx.save();
+        ictx.beginPath();
+        ictx.moveTo(top.x, top.y); ictx.lineTo(right.x, right.y);
+        ictx.lineTo(bottom.x, bottom.y); ictx.lineTo(left.x, left.y);
+        ictx.closePath(); ictx.clip();
+
+        const baseG = ictx.createLinearGradient(crystalX, top.y, crystalX, bottom.y);
+        baseG.addColorStop(0,   'rgba(255,255,255,0.92)');
+        baseG.addColorStop(0.28,'rgba(228,238,255,0.78)');
+        baseG.addColorStop(0.65,'rgba(198,218,255,0.58)');
+        baseG.addColorStop(1,   'rgba(168,198,255,0.36)');
+        ictx.fillStyle = baseG; ictx.fillRect(crystalX-R*1.1, top.y-2, R*2.2, bottom.y-top.y+4);
+
+        [[127,244,240,0.22],[176,110,255,0.18],[255,167,212,0.14]].forEach(([r,g,b,a],i) => {
+            const pa = T*0.22 + i*(Math.PI*2/3);
+            const pg = ictx.createRadialGradient(
+                crystalX+Math.cos(pa)*R*0.55, sceneY+Math.sin(pa)*R*0.4, 0,
+                crystalX+Math.cos(pa)*R*0.55, sceneY+Math.sin(pa)*R*0.4, R*1.15);
+            pg.addColorStop(0, `rgba(${r},${g},${b},${a})`); pg.addColorStop(1,'rgba(0,0,0,0)');
+            ictx.fillStyle = pg; ictx.fillRect(crystalX-R*1.1, top.y-2, R*2.2, bottom.y-top.y+4);
+        });
+
+        const hl = ictx.createRadialGradient(crystalX, sceneY-R*0.58, 0, crystalX, sceneY-R*0.58, R*0.56);
+        hl.addColorStop(0, `rgba(255,255,255,${0.78+Math.sin(T*1.9)*0.14})`);
+        hl.addColorStop(0.55,'rgba(255,255,255,0.12)'); hl.addColorStop(1,'rgba(255,255,255,0)');
+        ictx.fillStyle = hl; ictx.fillRect(crystalX-R*1.1, top.y-2, R*2.2, bottom.y-top.y+4);
+        ictx.restore();
+
+        ictx.beginPath();
+        ictx.moveTo(top.x, top.y); ictx.lineTo(right.x, right.y);
+        ictx.lineTo(bottom.x, bottom.y); ictx.lineTo(left.x, left.y);
+        ictx.closePath();
+        ictx.strokeStyle = 'rgba(255,255,255,0.72)'; ictx.lineWidth = 1.6; ictx.stroke();
+
+        ictx.lineWidth = 0.75; ictx.strokeStyle = 'rgba(200,228,255,0.38)';
+        [[top,crL],[top,crR],[crL,left],[crR,right],[crL,crR],
+         [left,bottom],[right,bottom],[crL,bottom],[crR,bottom]
+        ].forEach(([a,b]) => { ictx.beginPath(); ictx.moveTo(a.x,a.y); ictx.lineTo(b.x,b.y); ictx.stroke(); });
+    }
+
+    if (t > 0.50 && t < 0.93) {
+        const sp = (t - 0.50) / 0.43;
+        const shardCols = [[255,82,82],[82,255,143],[176,110,255],[82,194,255],[255,209,82],[255,82,196],[82,255,230]];
+        for (let i = 0; i < 7; i++) {
+            const angle = (i/7)*Math.PI*2 + i*0.38;
+            const dist  = sp * Math.min(W,H) * 0.13 * (0.55 + (i%3)*0.22);
+            const fx = crystalX + Math.cos(angle)*dist;
+            const fy = sceneY   + Math.sin(angle)*dist + sp*sp*16;
+            const fa = Math.max(0, 1 - sp*1.1) * 0.88;
+            const fs = Math.min(W,H) * 0.013 * (1 - sp*0.58);
+            const [sr,sg,sb] = shardCols[i];
+            ictx.save(); ictx.translate(fx, fy); ictx.rotate(T*4.5 + i*1.15);
+            ictx.beginPath();
+            ictx.moveTo(0,-fs*1.4); ictx.lineTo(fs*0.68,0); ictx.lineTo(0,fs); ictx.lineTo(-fs*0.68,0);
+            ictx.closePath();
+            ictx.fillStyle = `rgba(${sr},${sg},${sb},${fa})`; ictx.fill();
+            ictx.restore();
+        }
+    }
+
+    if (orbAlpha > 0.01) {
+        const oR    = Math.min(W,H) * 0.043;
+        const color = { r:160, g:80, b:255 };
+        const ob    = 0.62 + Math.sin(T*2.2)*0.18;
+        ictx.globalAlpha = orbAlpha;
+
+        const ag = ictx.createRadialGradient(orbX, sceneY, oR*0.3, orbX, sceneY, oR*2.8);
+        ag.addColorStop(0, `rgba(${color.r},${color.g},${color.b},${0.22+ob*0.16})`);
+        ag.addColorStop(0.5,`rgba(${color.r},${color.g},${color.b},0.05)`);
+        ag.addColorStop(1,  `rgba(${color.r},${color.g},${color.b},0)`);
+        ictx.fillStyle = ag; ictx.beginPath(); ictx.arc(orbX, sceneY, oR*2.8, 0, Math.PI*2); ictx.fill();
+
+        const bg = ictx.createRadialGradient(orbX+Math.sin(T)*oR*0.12, sceneY, oR*0.1, orbX, sceneY, oR);
+        bg.addColorStop(0,   `rgba(240,210,255,${0.52+ob*0.35})`);
+        bg.addColorStop(0.25,`rgba(200,140,255,${0.36+ob*0.28})`);
+        bg.addColorStop(0.6, `rgba(${color.r},${color.g},${color.b},${0.2+ob*0.2})`);
+        bg.addColorStop(1,   `rgba(${color.r},${color.g},${color.b},0.02)`);
+        ictx.fillStyle = bg;
+        ictx.beginPath();
+        for (let i=0; i<=48; i++) {
+            const a = (i/48)*Math.PI*2;
+            const w = Math.sin(a*4+T*1.6)*0.06 + Math.sin(a*7-T*2.2)*0.04;
+            const r = oR*(1+w);
+            const ox = orbX+Math.cos(a)*r, oy = sceneY+Math.sin(a)*r;
+            i===0 ? ictx.moveTo(ox,oy) : ictx.lineTo(ox,oy);
+        }
+        ictx.closePath(); ictx.fill();
+
+        const cG = ictx.createRadialGradient(orbX, sceneY, 0, orbX, sceneY, oR*0.45);
+        cG.addColorStop(0,  `rgba(255,255,255,${0.58+ob*0.28})`);
+        cG.addColorStop(0.4,`rgba(230,200,255,${0.35+ob*0.18})`);
+        cG.addColorStop(1,  'rgba(160,80,255,0)');
+        ictx.fillStyle = cG; ictx.beginPath(); ictx.arc(orbX, sceneY, oR*0.45, 0, Math.PI*2); ictx.fill();
+
+        ictx.globalAlpha = 1;
+    }
+
+    if (shockPhase > 0 && shockPhase < 1.4) {
+        const ringCols = ['rgba(212,167,255','rgba(127,244,240','rgba(255,167,212'];
+        for (let i=0; i<3; i++) {
+            const rp = Math.max(0, shockPhase - i*0.1);
+            if (rp <= 0 || rp > 1.2) continue;
+            const rR = rp * Math.min(W,H) * 0.22;
+            const rA = Math.max(0, 1-rp) * 0.42 * (1-i*0.24);
+            ictx.beginPath(); ictx.arc(crystalX, sceneY, rR, 0, Math.PI*2);
+            ictx.strokeStyle = `${ringCols[i]},${rA})`; ictx.lineWidth = 2.5-i*0.6; ictx.stroke();
+        }
+    }
+
+    if (t > 0.50 && t < 0.60) {
+        const fp = (t-0.50)/0.10, fa = (1-fp)*0.38;
+        const fg = ictx.createRadialGradient(crystalX, sceneY, 0, crystalX, sceneY, Math.min(W,H)*0.13);
+        fg.addColorStop(0,   `rgba(240,220,255,${fa})`);
+        fg.addColorStop(0.4, `rgba(192,132,252,${fa*0.4})`);
+        fg.addColorStop(1,   'rgba(100,60,200,0)');
+        ictx.fillStyle = fg; ictx.beginPath(); ictx.arc(crystalX, sceneY, Math.min(W,H)*0.13, 0, Math.PI*2); ictx.fill();
+    }
+
+    if (t > 0.30 && t < 0.50) {
+        const tipP = (t-0.30)/0.20;
+        const tipR = Math.min(W,H)*0.065*(0.5+tipP*0.5);
+        const tipA = (Math.sin(tipP*Math.PI*3)*0.28+0.28)*Math.min(1,tipP*3);
+        ictx.beginPath(); ictx.arc(orbX, sceneY, tipR, 0, Math.PI*2);
+        ictx.strokeStyle = `rgba(192,140,255,${tipA})`; ictx.lineWidth = 1.5; ictx.stroke();
+    }
+
+    const hint = $('tut-hint');
+    if (t > 0.22 && t < 0.50) {
+        hint.textContent = 'tap the orb';
+        hint.className   = 'tut-hint show tap-state';
+    } else if (t > 0.52 && t < 0.80) {
+        hint.textContent = 'smash the crystal';
+        hint.className   = 'tut-hint show shatter-state';
+    } else {
+        hint.className = 'tut-hint';
+    }
+
+    requestAnimationFrame(introLoop);
+}
+
+introLoop();
+
+// ═══════════════════════════════════════
+//  GAME FLOW
+// ═══════════════════════════════════════
+
+const STYLE_ORDER = [5,9,6,2,8,3,4,1,7,0];
+
+function prefetchLevels(fromLevel) {
+    if (!('serviceWorker' in navigator) || !navigator.serviceWorker.controller) return;
+    // One range request for whichever of the next 20 levels aren't cached;
+    // without a favourite the server applies the same STYLE_ORDER rotation
+    navigator.serviceWorker.controller.postMessage({
+        type: 'CACHE_LEVELS', from: fromLevel + 1, count: 20,
+        bass: state.favBassStyle, styleOrder: STYLE_ORDER,
+    });
+}
+
+async function loadLevel(n) {
+    $('offline-screen').classList.remove('show');
+    flushReplay();
+
+    try {
+        state.orbs = []; state.allOrbs = [];
+        state.playing = false; state.complete = false; state.freePlay = false; state.freePlayData = null;
+        shockwaves = []; crystalShards = []; energyMotes = []; crystalDust = []; bursts = [];
+        screenShake.intensity = 0;
+
+        const bassParam = state.favBassStyle !== null ? state.favBassStyle : STYLE_ORDER[(n - 1) % 10];
+        const url = `/api/level/${n}/bass/${bassParam}`;
+        const res = await fetch(url, { headers: { Accept: LEVEL_ACCEPT } });
+        if (!res.ok) throw new Error(`HTTP ${res.status}`);
+        const data = await readLevelResponse(res);
+
+        if (data.error === 'offline') throw new Error('offline');
+
+        state.level = n;
+        state.allOrbs = data.orbs;
+        state.orbs = [];
+        state.speed = data.speed; state.targetTime = data.targetTime;
+        state.timing = data.timing; state.points = data.points;
+        state.visibleAtOnce = data.visibleAtOnce || 4; state.totalOrbs = data.totalOrbs || data.orbs.length;
+        state.score = 0; state.melody = []; state.complete = false; state.levelCleared = false;
+        state.elapsed = 0; state.orbsHit = 0; state.orbsSpawned = 0;
+        state.replay = { hits: [], targets: [] };
+        state._chainReactionEarned = false; state._lastCrystalUsed = false;
+        state._spawnStaggerPending = 0;
+        state._wreckingBallEarned = false; state._orbsSpareEarned = false;
+        state._reveal = null;
+        state.bassStyle = bassParam;
+        audio.setBassStyle(state.bassStyle);
+        state.bpm = audio.getBpm(state.bassStyle);
+        state.measureMs = (60000 / state.bpm) * 4;
+
+        state.targets = data.targets.map(t => ({ ...t, alive: true, destroyTime: null }));
+        state.totalTargets = state.targets.length;
+        state.targetsDestroyed = 0;
+        state.targetTime = 5 + 1 * state.totalTargets;
+        state.silverTime = 5 + 2 * state.totalTargets;
+        state.bronzeTime = 5 + 3 * state.totalTargets;
+        state.targetDestroyRadius = data.targetDestroyRadius;
+        state.patternName = data.patternName || '';
+        state.batchName = data.batchName || '';
+        state.levelInSet = data.levelInSet || ((state.level - 1) % 10) + 1;
+        if (state.patternName) {
+            const _lnp = loadProgress();
+            const levelNames = _lnp.levelNames || {};
+            levelNames[n] = state.patternName; saveProgress({ levelNames });
+        }
+
+        $('h-time').textContent = '0.0s';
+        $('h-time').style.color = 'rgba(255,255,255,0.5)';
+        $('h-orbs').textContent = `${state.totalOrbs}`;
+        $('h-orbs').className = '';
+        $('h-orbs-total').textContent = `/${state.totalOrbs}`;
+        $('prog-fill').style.width = '0%';
+        buildCrystalDots();
+
+        prefetchLevels(n);
+
+    } catch (err) {
+        console.error('Failed to load level:', err);
+        $('offline-screen').classList.add('show');
+        $('offline-retry').onclick = async () => {
+            $('offline-screen').classList.remove('show');
+            await loadLevel(n);
+            if (!$('offline-screen').classList.contains('show')) startCountdown();
+        };
+    }
+}
+
+function spawnInitialOrbs() {
+    const toSpawn = state.allOrbs.filter(o => !o.spawned).slice(0, state.visibleAtOnce);
+    state._spawnStaggerPending = toSpawn.length;
+    toSpawn.forEach((orb, index) => {
+        setTimeout(() => {
+            state._spawnStaggerPending = Math.max(0, (state._spawnStaggerPending || 0) - 1);
+            spawnOrb(orb);
+        }, index * 250);
+    });
+}
+
+function spawnOrb(orb) {
+    if (orb.spawned) return;
+    let x, y, attempts = 0;
+    do { x = 25 + Math.random() * 50; y = 25 + Math.random() * 50; attempts++; }
+    while (attempts < 30 && state.orbs.some(o => !o.hit && Math.hypot(o.x - x, o.y - y) < 18));
+    orb.x = x; orb.y = y;
+    orb.spawned = true; orb.spawnTime = performance.now(); orb.fade = 0;
+    orb.shockVx = 0; orb.shockVy = 0; orb.shockEnergy = 0; orb.shockFlash = null;
+    orb._baseDriftSpeed = Math.hypot(orb.driftX, orb.driftY);
+    state.orbs.push(orb); state.orbsSpawned++;
+}
+
+function trySpawnNext() {
+    const inFlight = state._spawnStaggerPending || 0;
+    const liveOrbs = state.orbs.filter(o => !o.hit).length;
+    const slots = state.visibleAtOnce - liveOrbs - inFlight;
+    if (slots <= 0) return;
+    const unspawned = state.allOrbs.filter(o => !o.spawned);
+    for (let i = 0; i < Math.min(slots, unspawned.length); i++) {
+        spawnOrb(unspawned[i]);
+    }
+}
+
+async function startGame() {
+    if (state.started) return;
+    state.started = true;
+    introState.running = false;
+    await audio.init(); resize();
+    $('start-screen').classList.add('hidden');
+    document.getElementById('intro-menu-btn').style.display = 'none';
+    document.querySelector('.game-wrap').classList.add('started');
+    const p = loadProgress();
+    const today = new Date().toISOString().slice(0,10);
+    const days = p.daysPlayed || [];
+    if (!days.includes(today)) days.push(today);
+    saveProgress({ sessions: (p.sessions||0) + 1, daysPlayed: days, sessionClears: 0, sessionGolds: 0 });
+
+    // ── Tracking ──
+    try { gtag('event', 'game_start'); } catch(e) {}
+    trackOnce('lead', 'game_start_first', {}, 'Lead');
+    if (days.length > 1) { try { gtag('event', 'return_session', { days_played: days.length }); } catch(e) {} }
+
+    const resumeLevel = Math.max(1, p.resumeLevel || p.highestLevel || 1);
+    await loadLevel(resumeLevel); startCountdown();
+}
+
+function startCountdown() {
+    audio.stopBeat();
+    state._cdGen = (state._cdGen || 0) + 1;
+    const myGen = state._cdGen;
+
+    state.countdown = 3; state.countdownStart = performance.now(); state.playing = false;
+    const countMs = 550;
+    const totalMs = 3 * countMs;
+
+    const wrap = document.createElement('div');
+    wrap.className = 'cd-wrap';
+
+    const panel = document.createElement('div');
+    panel.className = 'cd-panel';
+
+    const levelNum  = document.createElement('div');
+    levelNum.className = 'cd-level-num';
+    levelNum.textContent = `Level ${state.level || 1}`;
+    panel.appendChild(levelNum);
+
+    if (state.patternName) {
+        const levelName = document.createElement('div');
+        levelName.className = 'cd-level-name';
+        levelName.textContent = state.patternName;
+        panel.appendChild(levelName);
+    }
+
+    const numEl = document.createElement('div');
+    numEl.className = 'cd-number c1';
+    numEl.textContent = '3';
+
+    wrap.appendChild(panel);
+    wrap.appendChild(numEl);
+    document.querySelector('.game-wrap').appendChild(wrap);
+
+    const colors = ['c1', 'c2', 'c3'];
+    const labels = ['3', '2', '1'];
+    [0, 1, 2].forEach(i => {
+        setTimeout(() => {
+            audio.countClick(i === 2);
+            const old = wrap.querySelector('.cd-number');
+            const n = document.createElement('div');
+            n.className = `cd-number ${colors[i]}`;
+            n.textContent = labels[i];
+            if (old) wrap.replaceChild(n, old);
+            else wrap.appendChild(n);
+        }, i * countMs);
+    });
+
+    setTimeout(() => wrap.classList.add('fade-out'), totalMs - 380);
+    setTimeout(() => {
+        if (state._cdGen !== myGen) return;
+        wrap.remove();
+        state.countdown = 0; spawnInitialOrbs();
+        const beatMs = (60000 / state.bpm);
+        const leadIn = beatMs * 0.75;
+        audio.startBeat(state.bpm, t => { state.beatTime = t + leadIn; state.startTime = t; });
+        state.playing = true;
+    }, totalMs + 80);
+}
+
+function showFloatingEnd() {
+    const data = state.freePlayData;
+    if (!data) return;
+    const { time, target } = data;
+    const { tier, text } = getTier(time, target);
+
+    const isNewBest = setBestTime(state.level, time);
+    const prevBest  = isNewBest ? null : getBestTime(state.level);
+    const _lp = loadProgress();
+    const _nextLvl = state.level >= TOTAL_LEVELS ? 1 : state.level + 1;
+    const _resumePatch = { resumeLevel: _nextLvl };
+    const _newHighest = Math.min(TOTAL_LEVELS, Math.max(_lp.highestLevel || 1, state.level + 1));
+    if (_newHighest > (_lp.highestLevel || 1)) _resumePatch.highestLevel = _newHighest;
+
+    const _prevStreak    = _lp.goldStreak || 0;
+    const _newStreak     = tier === 'gold' ? _prevStreak + 1 : 0;
+    const _newTotalGolds = (tier === 'gold' ? (_lp.totalGolds||0) + 1 : (_lp.totalGolds||0));
+    const _newSessGolds  = (tier === 'gold' ? (_lp.sessionGolds||0) + 1 : (_lp.sessionGolds||0));
+    const _goldPerLevel  = { ...(_lp.goldPerLevel||{}) };
+    if (tier === 'gold') _goldPerLevel[state.level] = Math.min(3, (_goldPerLevel[state.level]||0) + 1);
+    const _achFlags = { ...(_lp.achFlags||{}) };
+    if (state._chainReactionEarned) _achFlags.chainReaction = true;
+    if (state._lastCrystalUsed)     _achFlags.lastCrystal   = true;
+    if (state._wreckingBallEarned)  _achFlags.wreckingBall  = true;
+    if (state._orbsSpareEarned)     _achFlags.orbsSpare     = true;
+
+    saveProgress({
+        totalClears: (_lp.totalClears||0) + 1,
+        totalPlaySecs: (_lp.totalPlaySecs||0) + time,
+        sessionClears: (_lp.sessionClears||0) + 1,
+        goldStreak: _newStreak,
+        totalGolds: _newTotalGolds,
+        sessionGolds: _newSessGolds,
+        goldPerLevel: _goldPerLevel,
+        achFlags: _achFlags,
+        ..._resumePatch,
+    });
+    if (typeof checkAndToastAchievements === 'function') {
+        checkAndToastAchievements(_lp, loadProgress());
+    }
+
+    // ── Tracking ──
+    try { gtag('event', 'level_complete', { level: state.level, tier, time: Math.round(time * 10) / 10, pattern_name: state.patternName }); } catch(e) {}
+    trackOnce('first_clear', 'first_level_complete', { level: state.level }, 'ViewContent', { content_name: state.patternName, content_id: String(state.level) });
+    if ((loadProgress().highestLevel || 0) >= 5) {
+        trackOnce('retained', 'milestone', { level: 5 }, 'CompleteRegistration');
+    }
+
+    const card = $('ef-card');
+    card.className = `ef-card tier-${tier}`;
+    $('ef-level').innerHTML = levelLabel('end');
+    $('ef-tier').textContent = text;
+    $('ef-tier').className = `ef-tier-badge c-${tier}`;
+
+    const pbVal   = $('ef-pb-val');
+    const pbBadge = $('ef-pb-badge');
+    pbBadge.classList.remove('show');
+    if (isNewBest && tier !== 'none') {
+        pbVal.textContent = 'Personal best';
+        setTimeout(() => pbBadge.classList.add('show'), 820);
+    } else if (prevBest != null) {
+        pbVal.textContent = `Best: ${prevBest.toFixed(1)}s`;
+    } else {
+        pbVal.textContent = '';
+    }
+
+    $('ef-name').value = loadProgress().playerName || '';
+    $('end-float').classList.add('show');
+
+    const countStart = performance.now(); const dur = 600;
+    function tick() {
+        const p = Math.min(1, (performance.now() - countStart) / dur);
+        const ease = 1 - Math.pow(1 - p, 3);
+        $('ef-time-big').textContent = `${(time * ease).toFixed(1)}s`;
+        if (p < 1) requestAnimationFrame(tick);
+    }
+    setTimeout(() => requestAnimationFrame(tick), 200);
+}
+
+function endLevel(cleared = true) {
+    state.complete = true; state.playing = false;
+    state.levelCleared = cleared;
+
+    const broken  = state.targetsDestroyed;
+    const total   = state.totalTargets;
+    const ratio   = total > 0 ? broken / total : 0;
+
+    let msg;
+    if (broken === 0)          msg = 'Send those orbs flying and try again.';
+    else if (ratio < 0.4)      msg = `${broken} crystal${broken > 1 ? 's' : ''} down. Keep going.`;
+    else if (ratio < 0.75)     msg = 'Good progress — one more run should do it.';
+    else if (ratio < 1.0)      msg = 'So close. The shape is almost there.';
+    else                       msg = '';
+
+    const efCard = $('ef-card');
+    efCard.className = 'ef-card tier-fail';
+    $('ef-level').innerHTML = levelLabel('end');
+    $('ef-fail-crys-val').textContent = `${broken}/${total}`;
+    $('ef-fail-msg').textContent = msg;
+    audio.fail();
+    try { gtag('event', 'level_fail', { level: state.level, crystals_broken: broken, crystals_total: total }); } catch(e) {}
+    $('end-float').classList.add('show');
+}
+
+function resetGameUI() {
+    $('end-screen').classList.add('hidden');
+    $('end-float').classList.remove('show');
+    $('offline-screen').classList.remove('show');
+    document.querySelectorAll('.cd-wrap').forEach(el => el.remove());
+    state.freePlay = false;
+    state.complete = false;
+    const lsPanel   = document.getElementById('ls-panel');
+    const lsFooter  = document.getElementById('ls-footer');
+    const lsOverlay = document.getElementById('ls-overlay');
+    if (lsPanel)   { lsPanel.classList.remove('show', 'animating'); lsPanel.style.transform = ''; }
+    if (lsFooter)  { lsFooter.classList.remove('show'); lsFooter.style.transform = ''; }
+    if (lsOverlay) { lsOverlay.classList.remove('show'); }
+    const scroll = document.getElementById('ls-scroll');
+    if (scroll) scroll.innerHTML = '';
+}
+
+async function retry() {
+    resetGameUI();
+    audio.stopBeat();
+    await loadLevel(state.level); startCountdown();
+}
+async function next() {
+    resetGameUI();
+    audio.stopBeat();
+    const nextLevel = state.level >= TOTAL_LEVELS ? 1 : state.level + 1;
+    const p = loadProgress();
+    const _np = { resumeLevel: nextLevel };
+    const newHighest = Math.min(TOTAL_LEVELS, Math.max(p.highestLevel || 1, state.level + 1));
+    if (newHighest > (p.highestLevel || 1)) _np.highestLevel = newHighest;
+    saveProgress(_np);
+    await loadLevel(nextLevel); startCountdown();
+}
+
+$('btn-retry').addEventListener('click', () => { audio.unlock(); retry(); });
+$('btn-next').addEventListener('click', () => { audio.unlock(); next(); });
+$('ef-retry').addEventListener('click', () => { audio.unlock(); retry(); });
+$('ef-next').addEventListener('click', () => { audio.unlock(); next(); });
+$('ef-name').addEventListener('input', e => savePlayerName(e.target.value));
+$('ef-name').addEventListener('keydown', e => { if (e.key === 'Enter') e.target.blur(); });
+$('mute-btn').addEventListener('click', () => {
+    audio.beatOn = !audio.beatOn;
+    $('mute-btn').classList.toggle('muted', !audio.beatOn);
+    saveProgress({ muted: !audio.beatOn });
+});
+if (loadProgress().muted) {
+    audio.beatOn = false;
+    $('mute-btn').classList.add('muted');
+}
+
+$('bass-fav').addEventListener('click', () => {
+    if (state.favBassStyle !== null) state.favBassStyle = null;
+    else state.favBassStyle = state.bassStyle;
+    $('bass-fav').className = `ec-inner bass-fav${state.favBassStyle !== null ? ' locked' : ''} show`;
+});
+
+document.getElementById('intro-menu-btn').style.display = 'block';
+resize(); draw();
+
+// ═══════════════════════════════════════════════════════════════
+//  RENDER LOOP RESURRECTION
+// ═══════════════════════════════════════════════════════════════
+function _resurrectLoop() {
+    if (document.hidden) return;
+    const wallNow = Date.now();
+    const wallGap = wallNow - (state._lastDrawWall || wallNow);
+    if (wallGap < 1500) return;
+
+    const perfNow = performance.now();
+    const perfGap = perfNow - (state._lastDrawTime || perfNow);
+    if (state.playing && !state.complete && !state.freePlay) {
+        state.startTime += perfGap;
+    }
+    if (state.beatTime) state.beatTime += perfGap;
+
+    resize();
+    cancelAnimationFrame(state.rafId);
+    state.rafId = null;
+    state._lastDrawTime = perfNow;
+    state._lastDrawWall = wallNow;
+    draw();
+}
+
+document.addEventListener('visibilitychange', () => {
+    if (!document.hidden) _resurrectLoop();
+});
+window.addEventListener('pageshow', _resurrectLoop);
+document.addEventListener('touchstart', _resurrectLoop, { passive: true });
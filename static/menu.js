@@ -1,7 +1,7 @@
 // ═══════════════════════════════════════════════════════════════════════════════
 //  menu.js — Menu, Level Select, Achievements, Stats, Progress
 //
-//  Globals used from index.html (game script):
+//  Globals used from game.js:
 //    loadProgress, saveProgress, state, audio, loadLevel, startCountdown,
 //    resetGameUI, $
 //  Globals used from engine.js:
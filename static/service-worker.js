@@ -2,19 +2,49 @@
 // Caches app shell on install; serves API levels from cache when offline
 
 const SW_VERSION = 'gem-slap-v2';
-const SHELL_CACHE = SW_VERSION + '-shell';
+// ASSET_BUILD and SHELL_ASSETS are rewritten by `flask --app main build-assets`
+// to the deployed build's hashed script URLs
+const ASSET_BUILD = 'dev';
+const SHELL_CACHE = SW_VERSION + '-shell-' + ASSET_BUILD;
 const LEVEL_CACHE = SW_VERSION + '-levels';
 
 const SHELL_ASSETS = [
     '/',
     '/static/engine.js',
+    '/static/game.js',
+    '/static/menu.js',
 ];
 
-// ── Install: cache the app shell ──────────────────────────────────────────────
+// ── Level pack: every first-set level in one immutable download ───────────────
+const PACK_MANIFEST_URL = '/api/level_pack';
+
+async function cacheLevelPack() {
+    const res = await fetch(PACK_MANIFEST_URL);
+    if (!res.ok) return;  // pack not built — per-level caching still works
+    const manifest = await res.json();
+
+    const cache = await caches.open(LEVEL_CACHE);
+    const installed = await cache.match(PACK_MANIFEST_URL);
+    if (installed && (await installed.json()).hash === manifest.hash) return;
+
+    const packRes = await fetch(manifest.url);
+    if (!packRes.ok) return;
+    const { levels } = await packRes.json();
+    await Promise.all(levels.map(level => cache.put(
+        `/api/level/${level.level}/bass/${level.bassStyle}`,
+        new Response(JSON.stringify(level), { headers: { 'Content-Type': 'application/json' } })
+    )));
+    await cache.put(PACK_MANIFEST_URL, new Response(JSON.stringify(manifest), {
+        headers: { 'Content-Type': 'application/json' },
+    }));
+}
+
+// ── Install: cache the app shell and the level pack ───────────────────────────
 self.addEventListener('install', event => {
     event.waitUntil(
         caches.open(SHELL_CACHE)
             .then(cache => cache.addAll(SHELL_ASSETS))
+            .then(() => cacheLevelPack().catch(() => { /* offline play falls back to prefetch */ }))
             .then(() => self.skipWaiting())
     );
 });
@@ -58,6 +88,20 @@ self.addEventListener('fetch', event => {
         return;
     }
 
+    // Hashed build assets never change — cache first
+    if (url.pathname.startsWith('/assets/')) {
+        event.respondWith(
+            caches.open(SHELL_CACHE).then(async cache => {
+                const cached = await cache.match(event.request);
+                if (cached) return cached;
+                const res = await fetch(event.request);
+                if (res.ok) cache.put(event.request, res.clone());
+                return res;
+            })
+        );
+        return;
+    }
+
     // Shell assets — network first, fall back to cache
     if (url.pathname === '/' || url.pathname.startsWith('/static/')) {
         event.respondWith(
@@ -76,8 +120,64 @@ self.addEventListener('fetch', event => {
     }
 });
 
-// ── Message: explicit cache-a-level command from the game ─────────────────────
+// ── Batch prefetch: stream a level range as NDJSON into the level cache ───────
+// Without a fixed bass, level n uses styleOrder[(n - 1) % length], the same
+// rotation the server applies
+async function cacheLevelRange(from, count, bass, styleOrder) {
+    const fixedBass = bass !== null && bass !== undefined;
+    const levelUrl = n => `/api/level/${n}/bass/${fixedBass ? bass : styleOrder[(n - 1) % styleOrder.length]}`;
+
+    // Only fetch the span that isn't cached yet (usually just the newest
+    // level, and nothing at all inside an installed level pack)
+    const cache = await caches.open(LEVEL_CACHE);
+    const levels = Array.from({ length: count }, (_, i) => from + i);
+    const cached = await Promise.all(levels.map(n => cache.match(levelUrl(n))));
+    const missing = levels.filter((_, i) => !cached[i]);
+    if (!missing.length) return;
+
+    const first = missing[0], last = missing[missing.length - 1];
+    const params = new URLSearchParams({ from: first, count: last - first + 1, format: 'ndjson' });
+    if (fixedBass) params.set('bass', bass);
+    const res = await fetch(`/api/levels?${params}`);
+    if (!res.ok || !res.body) return;
+
+    // Store each level under the same URL loadLevel() fetches, as soon as
+    // its line arrives
+    const storeLine = line => {
+        if (!line.trim()) return;
+        const level = JSON.parse(line);
+        const url = `/api/level/${level.level}/bass/${level.bassStyle}`;
+        return cache.put(url, new Response(line, {
+            headers: { 'Content-Type': 'application/json' },
+        }));
+    };
+
+    const reader = res.body.pipeThrough(new TextDecoderStream()).getReader();
+    const pending = [];
+    let buffered = '';
+    for (;;) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffered += value;
+        const lines = buffered.split('\n');
+        buffered = lines.pop();
+        lines.forEach(line => pending.push(storeLine(line)));
+    }
+    pending.push(storeLine(buffered));
+    await Promise.all(pending);
+}
+
+// ── Message: explicit cache commands from the game ────────────────────────────
 self.addEventListener('message', event => {
+    if (event.data && event.data.type === 'CACHE_LEVELS') {
+        const { from, count, bass, styleOrder } = event.data;
+        event.waitUntil(
+            cacheLevelRange(from, count, bass, styleOrder)
+                .catch(() => { /* offline during prefetch — skip silently */ })
+        );
+        return;
+    }
+
     if (event.data && event.data.type === 'CACHE_LEVEL') {
         const { url } = event.data;
         caches.open(LEVEL_CACHE).then(async cache => {
@@ -0,0 +1,81 @@
+"""
+Concurrency stress test for generate_level under threaded workers.
+
+The level cache and the shared level store are both bypassed, so every
+request regenerates its level — otherwise they would hand back bytes built
+once and hide any interleaving of RNG draws between requests.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import random, sys, threading
+
+import pytest
+
+import main
+from level_cache import LevelCache
+
+LEVELS = range(1, 41)
+BASS_STYLES = (None, 0, 4)
+ROUNDS = 8
+THREADS = 32
+
+
+@pytest.fixture(autouse=True)
+def fast_thread_switching():
+    # A level builds well inside the default 5 ms GIL slice; switch far more
+    # often so threads actually interleave mid-generation
+    previous = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(previous)
+
+
+@pytest.fixture
+def uncached_app(monkeypatch):
+    monkeypatch.setattr(main, 'level_cache', LevelCache(0))
+    monkeypatch.setattr(main, 'level_store', None)
+    return main.app
+
+
+def level_url(level_num, bass_style):
+    if bass_style is None:
+        return f'/api/level/{level_num}'
+    return f'/api/level/{level_num}/bass/{bass_style}'
+
+
+def test_parallel_requests_return_identical_levels(uncached_app):
+    urls = [level_url(n, b) for n in LEVELS for b in BASS_STYLES]
+    client = uncached_app.test_client()
+    expected = {url: client.get(url).data for url in urls}
+
+    # Anything still drawing from the module RNG would be knocked off course
+    # by this thread reseeding it underneath the requests
+    stop = threading.Event()
+    def churn_global_rng():
+        while not stop.is_set():
+            random.seed(random.random())
+
+    def fetch(url):
+        response = uncached_app.test_client().get(url)
+        assert response.status_code == 200
+        return url, response.data
+
+    churn = threading.Thread(target=churn_global_rng, daemon=True)
+    churn.start()
+    try:
+        with ThreadPoolExecutor(THREADS) as pool:
+            results = list(pool.map(fetch, urls * ROUNDS))
+    finally:
+        stop.set()
+        churn.join()
+
+    assert len(results) == len(urls) * ROUNDS
+    mismatched = sorted({url for url, body in results if body != expected[url]})
+    assert mismatched == []
+    assert main.level_cache.stats()['hits'] == 0
+
+
+def test_parallel_generate_level_is_deterministic():
+    expected = {n: main.generate_level(n) for n in LEVELS}
+    with ThreadPoolExecutor(THREADS) as pool:
+        results = list(pool.map(lambda n: (n, main.generate_level(n)), list(LEVELS) * ROUNDS))
+    assert all(level == expected[n] for n, level in results)
@@ -0,0 +1,66 @@
+import threading
+
+import pytest
+
+from leaderboard import Leaderboard
+
+
+def verdict(level=1, bass=0, time_ms=5000.0, points=300):
+    return {
+        'level': level, 'bassStyle': bass, 'timeMs': time_ms, 'points': points,
+        'ratings': {'perfect': 3, 'great': 0, 'good': 0, 'miss': 0},
+    }
+
+
+def flush(board, timeout=5):
+    # flush() blocks forever if the writer has died, so bound it
+    done = threading.Event()
+    threading.Thread(target=lambda: (board.flush(), done.set()), daemon=True).start()
+    assert done.wait(timeout), 'leaderboard writer stopped draining the queue'
+
+
+@pytest.fixture
+def board(tmp_path):
+    return Leaderboard(str(tmp_path / 'leaderboard.db'))
+
+
+def test_top_orders_by_time_then_points(board):
+    for name, time_ms, points in [('c', 7000, 500), ('a', 5000, 100), ('b', 5000, 400), ('d', 9000, 900)]:
+        board.submit(verdict(time_ms=time_ms, points=points), name)
+    board.submit(verdict(level=2, time_ms=1000), 'other level')
+    flush(board)
+
+    top = board.top(1, limit=3)
+    assert [(s['rank'], s['name']) for s in top] == [(1, 'b'), (2, 'a'), (3, 'c')]
+    assert top[0]['ratings'] == {'perfect': 3, 'great': 0, 'good': 0, 'miss': 0}
+
+
+def test_top_filters_by_bass(board):
+    board.submit(verdict(bass=0, time_ms=4000), 'zero')
+    board.submit(verdict(bass=4, time_ms=6000), 'four')
+    flush(board)
+    assert [s['name'] for s in board.top(1)] == ['zero', 'four']
+    assert [s['name'] for s in board.top(1, bass=4)] == ['four']
+
+
+def test_writer_survives_a_bad_batch(board):
+    # 2**63 overflows SQLite's INTEGER with OverflowError, not sqlite3.Error
+    board.submit(verdict(level=2**63), 'overflow')
+    flush(board)
+    board.submit(verdict(time_ms=5000), 'after')
+    flush(board)
+
+    assert board._writer.is_alive()
+    assert [s['name'] for s in board.top(1)] == ['after']
+    assert board.dropped == 1
+
+
+def test_bad_row_does_not_drop_its_batch(tmp_path):
+    board = Leaderboard(str(tmp_path / 'leaderboard.db'), flush_interval=0.5)
+    board.submit(verdict(time_ms=5000), 'before')
+    board.submit(verdict(level=2**63), 'overflow')
+    board.submit(verdict(time_ms=6000), 'after')
+    flush(board)
+
+    assert [s['name'] for s in board.top(1)] == ['before', 'after']
+    assert board.dropped == 1
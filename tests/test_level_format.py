@@ -0,0 +1,115 @@
+"""
+Round-trips the compact wire formats back to the orbs generate_level built.
+
+The binary decoder here follows decodeLevelBinary() in static/engine.js:
+typed-array views at running offsets, then float32 columns re-rounded with
+Math.round to the precision the server sent.
+"""
+import json, math, struct
+
+import pytest
+
+import level_format
+import main
+from level_format import BINARY_MAGIC, FLOAT_COLUMNS, INT_COLUMNS
+
+# Decimal places generate_level rounds each float column to (_LEVEL_ROUND in engine.js)
+ROUND_SCALE = {'x': 10, 'y': 10, 'size': 100, 'driftX': 1000, 'driftY': 1000, 'phraseBeat': 100}
+ITEM_SIZE = {'f': 4, 'H': 2, 'b': 1, 'B': 1}
+
+STANDARD_URL = '/api/level/7/bass/4'
+ENDLESS_URL = f'/api/endless/52?orbs={main.MAX_ENDLESS_ORBS}&bass=3'
+
+
+def js_round(value, scale):
+    return math.floor(value * scale + 0.5) / scale
+
+
+def decode_binary(body):
+    assert body[:4] == BINARY_MAGIC
+    (meta_len,) = struct.unpack_from('<I', body, 4)
+    level = json.loads(body[8:8 + meta_len])
+    n = level['orbCount']
+    offset = 8 + meta_len
+    columns = {}
+    for key, code in [(key, 'f') for key in FLOAT_COLUMNS] + list(INT_COLUMNS):
+        # Typed-array views throw unless the offset is a multiple of the item size
+        assert offset % ITEM_SIZE[code] == 0, f'{key} column is misaligned'
+        columns[key] = list(struct.unpack_from(f'<{n}{code}', body, offset))
+        offset += n * ITEM_SIZE[code]
+    assert offset == len(body)
+    for key in FLOAT_COLUMNS:
+        columns[key] = [js_round(v, ROUND_SCALE[key]) for v in columns[key]]
+    return level, columns
+
+
+def orbs_from_columns(level, columns):
+    # _orbsFromColumns() in engine.js
+    return [
+        {
+            'id': i, 'x': columns['x'][i], 'y': columns['y'][i], 'size': columns['size'][i],
+            'driftX': columns['driftX'][i], 'driftY': columns['driftY'][i],
+            'phraseBeat': columns['phraseBeat'][i], 'note': columns['note'][i], 'wave': columns['wave'][i],
+            'color': level['colors'][columns['color'][i]],
+            'phraseName': level['phraseNames'][columns['phrase'][i]],
+        }
+        for i in range(level['orbCount'])
+    ]
+
+
+def assert_same_orbs(decoded, expected):
+    assert len(decoded) == len(expected)
+    for got, want in zip(decoded, expected, strict=True):
+        assert got.keys() == want.keys()
+        for key, value in want.items():
+            if key in ROUND_SCALE:
+                assert got[key] == pytest.approx(value, abs=1e-9), (want['id'], key)
+            else:
+                assert got[key] == value, (want['id'], key)
+
+
+@pytest.fixture
+def client():
+    return main.app.test_client()
+
+
+@pytest.fixture(params=[STANDARD_URL, ENDLESS_URL], ids=['standard', 'endless'])
+def level_url(request):
+    return request.param
+
+
+def test_columns_round_trip(client, level_url):
+    expected = client.get(level_url).json
+    response = client.get(level_url, headers={'Accept': level_format.COLUMNS_MIMETYPE})
+    assert response.mimetype == level_format.COLUMNS_MIMETYPE
+
+    level = response.json
+    compact_keys = ('format', 'orbCount', 'phraseNames', 'colors', 'orbColumns')
+    meta = {k: v for k, v in level.items() if k not in compact_keys}
+    assert meta == {k: v for k, v in expected.items() if k != 'orbs'}
+    assert_same_orbs(orbs_from_columns(level, level['orbColumns']), expected['orbs'])
+
+
+def test_binary_round_trip(client, level_url):
+    expected = client.get(level_url).json
+    response = client.get(level_url, headers={'Accept': level_format.BINARY_MIMETYPE})
+    assert response.mimetype == level_format.BINARY_MIMETYPE
+
+    level, columns = decode_binary(response.data)
+    assert level['format'] == 'binary'
+    assert level['orbCount'] == len(expected['orbs'])
+    assert_same_orbs(orbs_from_columns(level, columns), expected['orbs'])
+
+
+def test_endless_levels_exercise_the_wide_columns(client):
+    orbs = client.get(ENDLESS_URL).json['orbs']
+    assert len(orbs) == main.MAX_ENDLESS_ORBS
+    # wave only fits in the u16 column, not a byte
+    assert max(o['wave'] for o in orbs) > 255
+
+
+def test_binary_meta_is_padded_for_float_views():
+    for orbs in (1, 3, 7):
+        body = level_format.encode_binary(main.generate_endless_level(5, orbs))
+        (meta_len,) = struct.unpack_from('<I', body, 4)
+        assert (8 + meta_len) % 4 == 0
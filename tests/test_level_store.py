@@ -0,0 +1,72 @@
+import os
+
+import pytest
+from werkzeug.wsgi import FileWrapper
+
+from level_store import build_store, open_store
+
+MIMETYPES = ['application/json', 'application/x-test']
+
+
+def encode(level_num, bass_style, mimetype):
+    body = f'{mimetype}:{level_num}:{bass_style}:'.encode() * level_num
+    return body, f'{level_num:032d}'
+
+
+def test_open_at_reads_only_its_own_body(tmp_path):
+    path = str(tmp_path / 'levels.store')
+    build_store(path, [(n, 0) for n in range(1, 6)], encode, MIMETYPES, 'v1')
+    store = open_store(path, MIMETYPES, 'v1')
+
+    for key in [(3, 0, MIMETYPES[0]), (5, 0, MIMETYPES[1])]:
+        stored = store.get(key)
+        expected, _ = encode(*key)
+        assert bytes(stored.view) == expected
+
+        # A generic wrapper reads until EOF instead of honouring Content-Length
+        wrapper = FileWrapper(store.open_at(stored), buffer_size=7)
+        assert b''.join(wrapper) == expected
+        wrapper.close()
+
+
+def test_open_at_exposes_fileno_at_body_offset(tmp_path):
+    path = str(tmp_path / 'levels.store')
+    build_store(path, [(n, 0) for n in range(1, 4)], encode, MIMETYPES, 'v1')
+    store = open_store(path, MIMETYPES, 'v1')
+    stored = store.get((2, 0, MIMETYPES[0]))
+
+    body = store.open_at(stored)
+    try:
+        assert os.lseek(body.fileno(), 0, os.SEEK_CUR) == stored.offset
+    finally:
+        body.close()
+
+
+def test_open_at_refuses_a_replaced_file(tmp_path):
+    path = str(tmp_path / 'levels.store')
+    build_store(path, [(1, 0)], encode, MIMETYPES, 'v1')
+    store = open_store(path, MIMETYPES, 'v1')
+    stored = store.get((1, 0, MIMETYPES[0]))
+    build_store(path, [(1, 0)], encode, MIMETYPES, 'v1')
+    assert store.open_at(stored) is None
+
+
+def test_open_store_ignores_a_store_built_for_other_formats(tmp_path):
+    # Three wire formats when it was built, two now: must not index past the list
+    path = str(tmp_path / 'levels.store')
+    built_for = [*MIMETYPES, 'application/x-retired']
+    build_store(path, [(1, 0)], encode, built_for, 'v1:three')
+    assert open_store(path, MIMETYPES, 'v1:two') is None
+
+
+def test_open_store_treats_an_unknown_format_as_stale(tmp_path):
+    path = str(tmp_path / 'levels.store')
+    build_store(path, [(1, 0)], encode, [*MIMETYPES, 'application/x-retired'], 'v1')
+    assert open_store(path, MIMETYPES, 'v1') is None
+
+
+@pytest.mark.parametrize('contents', [b'', b'GSL', b'NOPE' + b'\0' * 8, b'GSLS\x05\0\0\0\x02\0\0\0v1'])
+def test_open_store_treats_a_corrupt_file_as_stale(tmp_path, contents):
+    path = tmp_path / 'levels.store'
+    path.write_bytes(contents)
+    assert open_store(str(path), MIMETYPES, 'v1') is None
@@ -0,0 +1,30 @@
+import json
+
+import pytest
+
+import main
+
+
+@pytest.fixture
+def client():
+    return main.app.test_client()
+
+
+@pytest.mark.parametrize('query, headers, mimetype', [
+    ('', {}, 'application/json'),
+    ('', {'Accept': 'application/x-ndjson'}, 'application/x-ndjson'),
+    ('&format=ndjson', {}, 'application/x-ndjson'),
+])
+def test_levels_range_varies_on_accept(client, query, headers, mimetype):
+    response = client.get(f'/api/levels?from=3&count=4{query}', headers=headers)
+    assert response.status_code == 200
+    assert response.mimetype == mimetype
+    assert 'Accept' in response.vary
+    assert response.headers['Cache-Control'] == main.ONE_DAY
+
+
+def test_levels_range_shapes_hold_the_same_levels(client):
+    array = client.get('/api/levels?from=3&count=4').json
+    lines = client.get('/api/levels?from=3&count=4&format=ndjson').data.decode().splitlines()
+    assert [json.loads(line) for line in lines] == array
+    assert [level['level'] for level in array] == [3, 4, 5, 6]
@@ -0,0 +1,202 @@
+import math
+
+import numpy as np
+import pytest
+
+import main
+from game_data import BASS_STYLES, GOOD_WINDOW, GREAT_WINDOW, PERFECT_WINDOW
+from leaderboard import Leaderboard
+from replay import (
+    INITIAL_SPAWN_STAGGER_MS, LEAD_IN_BEATS, RATINGS, ReplayError,
+    judge_hits, min_clear_ms, verify_replay,
+)
+
+
+def client_rating(phrase_beat, time_ms, bpm):
+    # getBrightness() + getRating() from static/engine.js and static/game.js,
+    # with JS % semantics, on the replay clock (beatTime = startTime + lead-in)
+    measure_ms = 60000 / bpm * 4
+    beat_ms = measure_ms / 4
+    elapsed = (math.fmod(time_ms - LEAD_IN_BEATS * beat_ms, measure_ms) + measure_ms) % measure_ms
+    dist = elapsed - (phrase_beat - 1) * beat_ms
+    if dist > measure_ms / 2:
+        dist -= measure_ms
+    if dist < -measure_ms / 2:
+        dist += measure_ms
+    dist = abs(dist)
+    if dist <= PERFECT_WINDOW:
+        return 'perfect'
+    if dist <= GREAT_WINDOW:
+        return 'great'
+    if dist <= GOOD_WINDOW:
+        return 'good'
+    return 'miss'
+
+
+def rating_names(phrase_beats, times_ms, bpm):
+    ratings = judge_hits(np.asarray(phrase_beats, dtype=np.float64), np.asarray(times_ms, dtype=np.float64), bpm)
+    return [RATINGS[r] for r in ratings]
+
+
+# ── Rating windows ─────────────────────────────────────────────────────────────
+@pytest.mark.parametrize('bpm', sorted({style['bpm'] for style in BASS_STYLES.values()}))
+def test_judge_hits_matches_client_get_rating(bpm):
+    times = np.arange(0, 12000, 7.3)
+    for phrase_beat in (1, 1.5, 2, 3, 3.75, 4):
+        expected = [client_rating(phrase_beat, t, bpm) for t in times]
+        assert rating_names([phrase_beat] * len(times), times, bpm) == expected
+
+
+@pytest.mark.parametrize('offset, rating', [
+    (0, 'perfect'),
+    (PERFECT_WINDOW, 'perfect'), (-PERFECT_WINDOW, 'perfect'),
+    (PERFECT_WINDOW + 0.5, 'great'), (GREAT_WINDOW, 'great'),
+    (GREAT_WINDOW + 0.5, 'good'), (-GOOD_WINDOW, 'good'),
+    (GOOD_WINDOW + 0.5, 'miss'),
+])
+def test_judge_hits_window_edges(offset, rating):
+    bpm = 120
+    beat_ms = 60000 / bpm
+    # Beat 3 of the second measure, counted from the first downbeat
+    on_beat = (LEAD_IN_BEATS + 4 + 2) * beat_ms
+    assert rating_names([3], [on_beat + offset], bpm) == [rating]
+
+
+# ── Verification ───────────────────────────────────────────────────────────────
+LEVEL = 1
+BASS = 0
+
+
+LEVEL_DATA = main.generate_level(LEVEL, BASS)
+
+
+@pytest.fixture
+def level():
+    return LEVEL_DATA
+
+
+def clear_replay(level, start_ms=2000, gap_ms=600):
+    # One hit per target on the opening orbs, each destroying its target
+    times = [start_ms + i * gap_ms for i in range(len(level['targets']))]
+    return {
+        'level': LEVEL, 'bass': BASS,
+        'hits': [[i, t] for i, t in enumerate(times)],
+        'targets': [[i, t] for i, t in enumerate(times)],
+    }
+
+
+def test_verify_replay_scores_a_clear(level):
+    replay = clear_replay(level)
+    verdict = verify_replay(level, replay)
+
+    bpm = BASS_STYLES[BASS]['bpm']
+    expected = [client_rating(level['orbs'][i]['phraseBeat'], t, bpm) for i, t in replay['hits']]
+    assert verdict['cleared']
+    assert verdict['timeMs'] == replay['targets'][-1][1]
+    assert verdict['ratings'] == {name: expected.count(name) for name in RATINGS}
+    assert verdict['points'] == sum(level['points'][name] for name in expected)
+    assert verdict['targetsDestroyed'] == len(level['targets'])
+
+
+def test_verify_replay_without_all_targets_is_not_cleared(level):
+    replay = clear_replay(level)
+    replay['targets'] = replay['targets'][:-1]
+    verdict = verify_replay(level, replay)
+    assert not verdict['cleared']
+    assert verdict['timeMs'] is None
+    assert verdict['tier'] == 'none'
+
+
+def test_verify_replay_accepts_later_orbs_once_earlier_ones_are_hit(level):
+    visible = level['visibleAtOnce']
+    hits = [[i, 2000 + i * 300] for i in range(visible + 3)]
+    verdict = verify_replay(level, {'hits': hits, 'targets': []})
+    assert sum(verdict['ratings'].values()) == visible + 3
+
+
+@pytest.mark.parametrize('mutate, message', [
+    (lambda r: r.update(hits='nope'), 'must be a list'),
+    (lambda r: r.update(hits=[[0, 1, 2]]), 'must be a list'),
+    (lambda r: r.update(hits=[[0.5, 2000]]), 'finite numbers'),
+    (lambda r: r.update(hits=[[0, float('nan')]]), 'finite numbers'),
+    (lambda r: r['hits'].append([len(LEVEL_DATA['orbs']), 9000]), 'unknown ids'),
+    (lambda r: r['hits'].append([0, 9000]), 'duplicate ids'),
+    (lambda r: r['hits'].append([5, 11 * 60 * 1000]), 'out of range'),
+    (lambda r: r['targets'].append([len(LEVEL_DATA['targets']), 2000]), 'unknown ids'),
+    (lambda r: r['targets'][0].__setitem__(1, 2500), 'coincide with a hit'),
+])
+def test_verify_replay_rejects_malformed_replays(level, mutate, message):
+    replay = clear_replay(level)
+    mutate(replay)
+    with pytest.raises(ReplayError, match=message):
+        verify_replay(level, replay)
+
+
+def test_verify_replay_rejects_orbs_that_have_not_spawned(level):
+    visible = level['visibleAtOnce']
+    # Only visibleAtOnce orbs are out before the first hit
+    with pytest.raises(ReplayError, match='not spawned'):
+        verify_replay(level, {'hits': [[visible, 3000]], 'targets': []})
+    # ...and one more per earlier hit
+    hits = [[0, 2000], [visible + 1, 3000]]
+    with pytest.raises(ReplayError, match='not spawned'):
+        verify_replay(level, {'hits': hits, 'targets': []})
+
+
+def test_verify_replay_rejects_hits_before_the_opening_stagger(level):
+    last = level['visibleAtOnce'] - 1
+    with pytest.raises(ReplayError, match='not spawned'):
+        verify_replay(level, {'hits': [[last, 10]], 'targets': []})
+    verify_replay(level, {'hits': [[last, last * INITIAL_SPAWN_STAGGER_MS]], 'targets': []})
+
+
+def test_verify_replay_rejects_impossibly_fast_clears(level):
+    # Opening orbs hit as soon as they could be, each shattering its target
+    forged = {'hits': [[0, 1000], [1, 1010], [2, 1020]], 'targets': [[0, 1000], [1, 1010], [2, 1020]]}
+    assert len(level['targets']) == 3
+    with pytest.raises(ReplayError, match='faster than the level allows'):
+        verify_replay(level, forged)
+
+    floor = min_clear_ms(BASS_STYLES[BASS]['bpm'], len(level['targets']))
+    replay = clear_replay(level, start_ms=floor - 20, gap_ms=10)
+    assert verify_replay(level, replay)['timeMs'] == floor
+
+
+# ── Endpoint ───────────────────────────────────────────────────────────────────
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    monkeypatch.setattr(main, 'leaderboard', Leaderboard(str(tmp_path / 'leaderboard.db')))
+    return main.app.test_client()
+
+
+def test_submit_replay_queues_clears_by_name(client, level):
+    response = client.post('/api/replay', json={**clear_replay(level), 'name': '  Ada  '})
+    assert response.status_code == 202
+    assert response.json['queued'] and response.json['name'] == 'Ada'
+
+    main.leaderboard.flush()
+    scores = client.get(f'/api/leaderboard/{LEVEL}').json['scores']
+    assert [(s['name'], s['timeMs']) for s in scores] == [('Ada', response.json['timeMs'])]
+
+
+@pytest.mark.parametrize('patch', [
+    {'level': 0}, {'level': 2**63}, {'level': '1'}, {'bass': 999},
+])
+def test_submit_replay_rejects_bad_levels(client, level, patch):
+    response = client.post('/api/replay', json={**clear_replay(level), **patch})
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize('level_num', [0, 2**31, 2**63])
+def test_leaderboard_rejects_levels_out_of_range(client, level_num):
+    response = client.get(f'/api/leaderboard/{level_num}')
+    assert response.status_code == 400
+
+
+def test_submit_replay_rejects_forged_clear(client):
+    forged = {'level': LEVEL, 'bass': BASS, 'hits': [[0, 1000], [1, 1010], [2, 1020]],
+              'targets': [[0, 1000], [1, 1010], [2, 1020]]}
+    response = client.post('/api/replay', json=forged)
+    assert response.status_code == 400
+    main.leaderboard.flush()
+    assert client.get(f'/api/leaderboard/{LEVEL}').json['scores'] == []